@@ -0,0 +1,139 @@
+"""Benchmarks for the performance sensitive parts of the game.
+
+Run with: python benchmark.py"""
+import time
+from typing import Callable, List, Tuple
+
+import numpy as np
+
+import main
+from main import MAP_GENERATORS, map_create, map_find_lines, map_line_tiles
+
+# Map sizes (width, height) the generators are measured at
+BENCH_MAP_SIZES: List[Tuple[int, int]] = [(80, 50), (256, 256), (1024, 1024)]
+
+# Number of chasing monsters added to the game when measuring turns
+BENCH_MONSTERS: List[int] = [0, 100, 1000]
+
+# Number of lines rasterized at once when measuring map_find_lines
+BENCH_LINES = 1000
+
+# Renderer backends the turns are measured with (the windowed one needs a display)
+BENCH_RENDERERS: List[str] = ["null", "offscreen"]
+
+# Minimum time spent measuring each case, in seconds
+BENCH_MIN_TIME = 1.0
+BENCH_MIN_RUNS = 3
+
+
+def bench_time(function: Callable, min_time: float = BENCH_MIN_TIME, min_runs: int = BENCH_MIN_RUNS) -> float:
+    """Calls the function repeatedly and returns how many calls per second it managed.
+
+    # Arguments
+    function : The function to measure. Called without arguments.
+
+    min_time : Keep calling the function for at least this many seconds.
+
+    min_runs : Call the function at least this many times."""
+    runs = 0
+    start = time.perf_counter()
+    elapsed = 0.0
+    while elapsed < min_time or runs < min_runs:
+        function()
+        runs += 1
+        elapsed = time.perf_counter() - start
+
+    return runs / elapsed
+
+
+def bench_generators():
+    """Prints the number of maps per second every generator creates at each of BENCH_MAP_SIZES."""
+    print(f"{'generator':<10}" + "".join(f"{f'{w}x{h}':>14}" for w, h in BENCH_MAP_SIZES) + "   (maps/second)")
+
+    for generator in MAP_GENERATORS:
+        results = []
+        for width, height in BENCH_MAP_SIZES:
+            seeds = iter(range(1_000_000))
+            results.append(bench_time(lambda: map_create(generator, width, height, seed=next(seeds))))
+
+        print(f"{generator:<10}" + "".join(f"{result:>14.1f}" for result in results))
+
+
+def bench_line_pairs(count: int, seed: int = 0) -> np.ndarray:
+    """Returns an array of shape (count, 4) of (x1, y1, x2, y2) line endpoints: points, straight
+    and diagonal lines in every direction, then random lines."""
+    edge_cases = [(0, 0, 0, 0), (3, 3, 3, 3), (0, 0, 7, 0), (0, 0, -7, 0), (0, 0, 0, 7), (0, 0, 0, -7),
+                  (0, 0, 5, 5), (0, 0, -5, 5), (0, 0, 5, -5), (0, 0, -5, -5)]
+    # One line in each octant, and lines that are almost flat or almost straight
+    edge_cases += [(0, 0, sign_x * a, sign_y * b) for sign_x in (1, -1) for sign_y in (1, -1)
+                   for a, b in [(7, 3), (3, 7), (9, 1), (1, 9), (20, 19), (19, 20)]]
+
+    rng = np.random.default_rng(seed)
+    random_pairs = rng.integers(-40, 40, size=(max(count - len(edge_cases), 0), 4))
+
+    return np.concatenate([np.array(edge_cases), random_pairs])[:count]
+
+
+def bench_lines():
+    """Checks that map_find_lines rasterizes the same tiles as map_line_tiles, then prints the number
+    of lines per second each of them rasterizes, BENCH_LINES at a time."""
+    pairs = bench_line_pairs(BENCH_LINES)
+    xs, ys, lengths = map_find_lines(pairs[:, :2], pairs[:, 2:])
+    for (x1, y1, x2, y2), line_xs, line_ys, length in zip(pairs.tolist(), xs, ys, lengths):
+        batch_line = tuple(zip(line_xs[:length].tolist(), line_ys[:length].tolist()))
+        assert batch_line == map_line_tiles(x1, y1, x2, y2), ((x1, y1, x2, y2), batch_line)
+
+    def one_by_one():
+        map_line_tiles.cache_clear()
+        for x1, y1, x2, y2 in pairs.tolist():
+            map_line_tiles(x1, y1, x2, y2)
+
+    print(f"{'lines':<10}{'one by one':>14}{'batch':>14}   (lines/second)")
+    print(f"{'':<10}{bench_time(one_by_one) * BENCH_LINES:>14.0f}"
+          f"{bench_time(lambda: map_find_lines(pairs[:, :2], pairs[:, 2:])) * BENCH_LINES:>14.0f}")
+
+
+def bench_spawn_monsters(count: int, seed: int = 0):
+    """Adds count chasing monsters on random floor tiles of the current map."""
+    rng = np.random.default_rng(seed)
+    floor_x, floor_y = np.nonzero(~main.GAME.current_map.block_path)
+    for tile in rng.integers(len(floor_x), size=count):
+        main.GAME.current_objects.append(
+            main.obj_Actor(int(floor_x[tile]), int(floor_y[tile]), "crab", main.ASSETS.A_ENEMY,
+                           creature=main.com_Creature("crab"), ai=main.ai_Chase()))
+
+
+def bench_turn():
+    """Plays one turn: every monster acts, then the field of view is computed and the game drawn."""
+    for obj in main.GAME.current_objects:
+        if obj.ai:
+            obj.ai.take_turn()
+
+    main.FOV_CALCULATE = True
+    main.map_calculate_fov()
+    main.draw_game()
+
+
+def bench_turns():
+    """Prints the number of turns per second with each of BENCH_RENDERERS and BENCH_MONSTERS.
+
+    The null renderer measures the cost of the game alone, the difference with the offscreen
+    renderer is the cost of drawing it."""
+    print(f"{'renderer':<10}" + "".join(f"{f'{n} monsters':>14}" for n in BENCH_MONSTERS) + "   (turns/second)")
+
+    for renderer in BENCH_RENDERERS:
+        results = []
+        for monsters in BENCH_MONSTERS:
+            main.game_initialize(renderer)
+            bench_spawn_monsters(monsters)
+            results.append(bench_time(bench_turn))
+
+        print(f"{renderer:<10}" + "".join(f"{result:>14.1f}" for result in results))
+
+
+if __name__ == "__main__":
+    bench_generators()
+    print()
+    bench_lines()
+    print()
+    bench_turns()
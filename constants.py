@@ -1,19 +1,56 @@
 # Constant Variables
-CELL_WIDTH = 32
-CELL_HEIGHT = 32
+# The game is drawn with tiles of this size (the size of the DawnLike sprites), then scaled up by DISPLAY_SCALE
+CELL_WIDTH = 16
+CELL_HEIGHT = 16
 
 CELL_SIZE = (CELL_WIDTH, CELL_HEIGHT)
 
 GAME_FPS = 60
 
+# Idle Settings
+# "event" : wait for input, only redrawing when something happens or an animation needs its next frame
+# "poll" : redraw the game GAME_FPS times a second, even when nothing happens
+IDLE_POLICY = "event"
+
+# Display Settings
+# "windowed" : draw in a window
+# "offscreen" : draw in memory only, without a window (uses SDL's dummy video driver)
+# "null" : do not draw at all, only run the game
+RENDERER_BACKEND = "windowed"
+DISPLAY_SCALE = 2  # The whole frame is scaled up by this (integer) factor when it is sent to the window
+DISPLAY_SMOOTH = False  # If True, the frame is scaled with a smoothing filter instead of keeping the pixels sharp
+DISPLAY_DIRTY_RECTS = True  # If True, only the parts of the screen that changed are sent to the display
+DIRTY_RECTS_MAX = 64  # Above this many changed rectangles, they are merged into one
+TEXT_CACHE_SIZE = 256  # Maximum number of rendered texts kept in memory
+ATLAS_PAGE_SIZE = (512, 512)  # Maximum size of the surfaces the sprites are packed into
+ASSET_CACHE_DIR = ".asset_cache"  # Where the packed sprites are saved between launches, None to disable
+
 # Map Constants
 MAP_WIDTH = 20
 MAP_HEIGHT = 20
 
+# Map Generation Settings
+MAP_GENERATOR = "box"  # One of "box", "bsp", "caves", "drunkard"
+MAP_SEED = None  # If None, every map is different
+
+# Chunked Map Settings
+MAP_CHUNKED = False  # If True, the world is an unbounded map generated in chunks
+CHUNK_SIZE = 32
+CHUNK_CACHE_SIZE = 64  # Maximum number of chunks kept in memory
+
+# Spawn Settings
+PLAYER_SPAWN = (13, 13)  # Where the player starts (or the closest free tile)
+SPAWN_CLEAR_RADIUS = 4  # How far around PLAYER_SPAWN the walls of a chunked map are removed
+
+# Camera Settings (in tiles)
+CAMERA_WIDTH = 20
+CAMERA_HEIGHT = 20
+
 # Game size
-GAME_WIDTH = MAP_WIDTH * CELL_WIDTH
-GAME_HEIGHT = MAP_HEIGHT * CELL_HEIGHT
-WINDOW_SIZE = (GAME_WIDTH, GAME_HEIGHT)
+GAME_WIDTH = CAMERA_WIDTH * CELL_WIDTH
+GAME_HEIGHT = CAMERA_HEIGHT * CELL_HEIGHT
+SCENE_SIZE = (GAME_WIDTH, GAME_HEIGHT)  # The size the game is drawn at
+WINDOW_SIZE = (GAME_WIDTH * DISPLAY_SCALE, GAME_HEIGHT * DISPLAY_SCALE)
 
 # Color definitions
 COLOR_BLACK = (0, 0, 0)
@@ -28,20 +65,46 @@ COLOR_D_GREEN = (0, 200, 0)
 # Game Colors
 COLOR_DEFAULT_BG = COLOR_GREY
 
+# Minimap colors of the unexplored, explored floor, explored wall, visible floor and visible wall tiles
+COLOR_MINIMAP_TILES = ((0, 0, 0), (50, 50, 50), (110, 110, 110), (120, 120, 90), (230, 230, 200))
+COLOR_MINIMAP_PLAYER = COLOR_L_GREEN
+COLOR_MINIMAP_CREATURE = COLOR_RED
+
 # Sprites
 # Sprites from DawnLike tileset
 # (https://imgur.com/a/TECi6)
 # (https://opengameart.org/content/dawnlike-16x16-universal-rogue-like-tileset-v181)
 # Thanks to DawnBringer for the graphics
 
+# AI Settings
+FLOW_FIELD_RADIUS = 32  # How far from the player monsters can follow the distance field
+
+# Pathfinding Settings
+PATH_SEARCH_MARGIN = 16  # How far outside the box around the start and the goal a path may go
+PATH_ACTOR_COST = 10  # Extra cost of walking through a tile with a creature on it
+PATH_CACHE_SIZE = 256  # Maximum number of paths kept in the cache
+MAP_CHANGE_LOG_SIZE = 256  # Number of terrain changes a map remembers
+LINE_CACHE_SIZE = 1024  # Maximum number of lines remembered by map_find_line
+
 # FOV Settings
 FOV_ALGO = 0 # libtcod.FOV_BASIC
 FOV_LIGHT_WALLS = True
 TORCH_RADIUS = 10
 
+# Lighting Settings
+LIGHTING = True  # If False, every visible tile is fully lit
+LIGHT_AMBIENT = 0.4  # Light level of the visible tiles no light reaches, from 0 to 1
+
+# Minimap Settings
+SHOW_MINIMAP = True  # If True, a minimap of the area around the player is drawn in the top right corner
+MINIMAP_TILES = 32  # Width and height, in tiles, of the area shown by the minimap
+MINIMAP_TILE_SIZE = 2  # Width and height, in pixels, of a tile on the minimap
+MINIMAP_CHUNKED_TILES = 128  # Width and height, in tiles, of the area the minimap keeps of a chunked map
+
 # Message Settings
 NUM_MESSAGES = 4
-PIXELS_UNDER_MESSAGES = 2
+PIXELS_UNDER_MESSAGES = 1
+MESSAGE_SCROLL_LINES = 1  # How many lines page up / page down scroll the messages by
 
 # Cursor Settings
 USE_CURSOR = False
@@ -1,28 +1,45 @@
+import hashlib
+import os
 import tcod as libtcod
 import pygame
+import numpy as np
 from typing import List, Tuple, Callable, Union, Dict
+from collections import OrderedDict, deque
+from functools import lru_cache, partial
 
 # Game Files
 from constants import *
 
 PYGAME_DISPLAY: pygame.Surface = None
+RENDERER: 'obj_WindowedRenderer' = None
 SURFACE_MAIN: pygame.Surface = None
 FOV_CALCULATE: bool = None
 CLOCK: pygame.time.Clock = None
 ASSETS: 'struc_Assets' = None
+CAMERA: 'obj_Camera' = None
+TERRAIN_LAYER: 'obj_TerrainLayer' = None
+DIRTY_RECTS: 'obj_DirtyRects' = None
+TEXT_CACHE: 'obj_TextCache' = None
+MESSAGE_PANEL: 'obj_MessagePanel' = None
+RENDER_QUEUE: 'obj_RenderQueue' = None
+SCHEDULER: 'obj_FrameScheduler' = None
+ANIMATION_CLOCK: 'obj_AnimationClock' = None
+LIGHT_MAP: 'obj_LightMap' = None
 
 # Typing
-T_MAP = List[List['struc_Tile']]
+T_MAP = 'obj_Map'
 T_SURFACE = pygame.Surface
 T_RECT = Union[pygame.Rect, Tuple[int, int, int, int]]
 T_CREATURE = 'com_Creature'
 T_AI = 'ai_Test'
 T_ITEM = 'com_Item'
 T_CONTAINER = 'com_Container'
+T_LIGHT = 'com_Light'
 T_COLOR = Tuple[int, int, int]
 T_COORDINATE = Tuple[int, int]
 T_MESSAGE = Tuple[str, T_COLOR, T_COLOR]
 T_ACTOR = 'obj_Actor'
+T_ACTOR_INDEX = 'obj_ActorIndex'
 T_FONT = pygame.font.Font
 
 
@@ -34,8 +51,17 @@ T_FONT = pygame.font.Font
 
 
 class struc_Tile:
-    """This class functions as a struct that tracks the data for each
-    tile within a map.
+    """This class functions as a struct that gives access to the data of
+    a single tile within a map.  The data itself is stored in the arrays
+    of the map, and reading or writing a property goes through the methods
+    of the map, so the map knows about every change.
+
+    # Arguments
+    owner_map : The obj_Map (or obj_ChunkedMap) the tile belongs to.
+
+    x : The x coordinate of the tile.
+
+    y : The y coordinate of the tile.
 
     # Properties
     struc_Tile.block_path : TRUE if tile prevents actors from moving
@@ -44,9 +70,91 @@ class struc_Tile:
     struc_Tile.explored : Initializes to FALSE, set to true if player
     has seen it before."""
 
-    def __init__(self, block_path: bool):
-        self.block_path = block_path
-        self.explored = False
+    __slots__ = ("owner_map", "x", "y")
+
+    def __init__(self, owner_map: T_MAP, x: int, y: int):
+        self.owner_map = owner_map
+        self.x = x
+        self.y = y
+
+    @property
+    def block_path(self) -> bool:
+        return self.owner_map.is_blocked(self.x, self.y)
+
+    @block_path.setter
+    def block_path(self, value: bool):
+        self.owner_map.set_block_path(self.x, self.y, value)
+
+    @property
+    def explored(self) -> bool:
+        return self.owner_map.is_explored(self.x, self.y)
+
+    @explored.setter
+    def explored(self, value: bool):
+        self.owner_map.set_explored(self.x, self.y, value)
+
+
+class struc_MapColumn:
+    """This class functions as a struct for a single column of a map, so
+    that tiles can be reached with map[x][y].
+
+    # Arguments
+    owner_map : The obj_Map the column belongs to.
+
+    x : The x coordinate of the column."""
+
+    __slots__ = ("owner_map", "x")
+
+    def __init__(self, owner_map: T_MAP, x: int):
+        self.owner_map = owner_map
+        self.x = x
+
+    def __getitem__(self, y: int) -> struc_Tile:
+        return self.owner_map.tile(self.x, y)
+
+    def __len__(self) -> int:
+        return self.owner_map.height
+
+
+class struc_Area:
+    """This class functions as a struct for the result of an area query
+    (see map_find_area).  The tiles in the area are stored as a boolean
+    mask over the smallest rectangle of the map that contains the shape.
+
+    # Arguments
+    mask : boolean array, TRUE for the tiles in the area, indexed [x, y].
+
+    origin : The map coordinates of mask[0, 0].
+
+    # Methods
+    struc_Area.indices : returns the x and y coordinates of the tiles as arrays.
+
+    struc_Area.tiles : returns the coordinates of the tiles as a list.
+
+    struc_Area.contains : returns TRUE if the tile is in the area."""
+
+    __slots__ = ("mask", "origin")
+
+    def __init__(self, mask: np.ndarray, origin: T_COORDINATE):
+        self.mask = mask
+        self.origin = origin
+
+    def indices(self) -> Tuple[np.ndarray, np.ndarray]:
+        xs, ys = np.nonzero(self.mask)
+        return xs + self.origin[0], ys + self.origin[1]
+
+    def tiles(self) -> List[T_COORDINATE]:
+        xs, ys = self.indices()
+        return list(zip(xs.tolist(), ys.tolist()))
+
+    def contains(self, x: int, y: int) -> bool:
+        local_x, local_y = x - self.origin[0], y - self.origin[1]
+        width, height = self.mask.shape
+
+        return 0 <= local_x < width and 0 <= local_y < height and bool(self.mask[local_x, local_y])
+
+    def __len__(self) -> int:
+        return int(np.count_nonzero(self.mask))
 
 
 class struc_Assets:
@@ -54,38 +162,44 @@ class struc_Assets:
     game. This includes sprites, sound effects, and music."""
 
     def __init__(self):
-        # Spritesheets
-        # self.spritesheet_player = obj_Spritesheet("data/reptiles.png", 16, 16)
-        # self.spritesheet_aquatic = obj_Spritesheet("data/aquatic.png", 16, 16)
-
-        self.spritesheet_player = obj_Spritesheet_Set(
-            access_dawnlike_list(["Player0", "Player1"], "Characters/"), 16, 16)
-        self.spritesheet_aquatic = obj_Spritesheet_Set(
-            access_dawnlike_list(["Aquatic0", "Aquatic1"], "Characters/"), 16, 16)
-
-        self.spritesheet_wall = obj_Spritesheet(access_dawnlike("Objects/Wall"), 16, 16)
-        self.spritesheet_floor = obj_Spritesheet(access_dawnlike("Objects/Floor"), 16, 16)
+        # Sprites are packed in a texture atlas, the spritesheets are only loaded while it is built,
+        # and not at all when the atlas is in the cache
+        self.atlas = obj_Atlas()
+
+        sheets_player = access_dawnlike_list(["Player0", "Player1"], "Characters/")
+        sheets_aquatic = access_dawnlike_list(["Aquatic0", "Aquatic1"], "Characters/")
+        sheet_wall = access_dawnlike("Objects/Wall")
+        sheet_floor = access_dawnlike("Objects/Floor")
+
+        # Sprite ids in the atlas
+        self.ID_PLAYER: List[int] = [self.atlas.add(sheet, 0, 3, 16, 16, CELL_SIZE) for sheet in sheets_player]
+        self.ID_ENEMY: List[int] = [self.atlas.add(sheet, 5, 0, 16, 16, CELL_SIZE) for sheet in sheets_aquatic]
+        self.ID_WALL: int = self.atlas.add(sheet_wall, 3, 3, 16, 16, CELL_SIZE)
+        self.ID_WALL_EXPLORED: int = self.atlas.add(sheet_wall, 3, 3, 16, 16, CELL_SIZE, (100, 100, 100))
+        self.ID_FLOOR: int = self.atlas.add(sheet_floor, 1, 4, 16, 16, CELL_SIZE)
+        self.ID_FLOOR_EXPLORED: int = self.atlas.add(sheet_floor, 1, 4, 16, 16, CELL_SIZE, (100, 100, 100))
+        self.ID_CROSSHAIR: int = self.atlas.add(sheet_wall, 1, 1, 16, 16, CELL_SIZE)
+
+        self.atlas.build()
 
         # Animations
-        self.A_PLAYER = self.spritesheet_player.get_animation([(0, 0, 3), (1, 0, 3)], CELL_SIZE)
-        self.A_ENEMY = self.spritesheet_aquatic.get_animation([(0, 5, 0), (1, 5, 0)], CELL_SIZE)
+        self.A_PLAYER = [self.atlas.sprite(sprite_id) for sprite_id in self.ID_PLAYER]
+        self.A_ENEMY = [self.atlas.sprite(sprite_id) for sprite_id in self.ID_ENEMY]
 
         # Sprites
-        self.S_WALL = self.spritesheet_wall.get_sprite(3, 3, CELL_SIZE)
-        self.S_WALL_EXPLORED: T_SURFACE = self.S_WALL.copy()
-        self.S_WALL_EXPLORED.fill((100, 100, 100), special_flags=pygame.BLEND_MULT)
+        self.S_WALL = self.atlas.sprite(self.ID_WALL)
+        self.S_WALL_EXPLORED: T_SURFACE = self.atlas.sprite(self.ID_WALL_EXPLORED)
 
-        self.S_FLOOR = self.spritesheet_floor.get_sprite(1, 4, CELL_SIZE)
-        self.S_FLOOR_EXPLORED = self.S_FLOOR.copy()
-        self.S_FLOOR_EXPLORED.fill((100, 100, 100), special_flags=pygame.BLEND_MULT)
+        self.S_FLOOR = self.atlas.sprite(self.ID_FLOOR)
+        self.S_FLOOR_EXPLORED = self.atlas.sprite(self.ID_FLOOR_EXPLORED)
 
-        self.S_CROSSHAIR = self.spritesheet_wall.get_sprite(1, 1, CELL_SIZE)
+        self.S_CROSSHAIR = self.atlas.sprite(self.ID_CROSSHAIR)
         self.S_CROSSHAIR.set_alpha(150)
 
         # Fonts
-        self.F_STANDARD: T_FONT = pygame.font.Font(None, 30)
-        self.F_MESSAGE: T_FONT = pygame.font.Font(access_dawnlike("GUI/SDS_8x8.ttf"), 16)
-        self.F_SMALL_MESSAGE: T_FONT = pygame.font.Font(access_dawnlike("GUI/SDS_6x6.ttf"), 16)
+        self.F_STANDARD: T_FONT = pygame.font.Font(None, 15)
+        self.F_MESSAGE: T_FONT = pygame.font.Font(access_dawnlike("GUI/SDS_8x8.ttf"), 8)
+        self.F_SMALL_MESSAGE: T_FONT = pygame.font.Font(access_dawnlike("GUI/SDS_6x6.ttf"), 8)
 
         if USE_CURSOR:
             self.S_CURSOR_STANDARD: T_SURFACE = pygame.image.load("data/cursor_standard.png").convert()
@@ -100,462 +214,2367 @@ class struc_Assets:
             self.S_CURSOR_UNUSED.set_colorkey(COLOR_WHITE)
             self.S_CURSOR_UNUSED = pygame.transform.scale(self.S_CURSOR_UNUSED, CURSOR_SIZE).convert()
 
-            # TODO: Add inpect cursor
-            self.S_CURSOR_INSPECT: T_SURFACE = None
-        else:
-            self.S_CURSOR_STANDARD: T_SURFACE = None
-            self.S_CURSOR_INVENTORY: T_SURFACE = None
-            self.S_CURSOR_INSPECT: T_SURFACE = None
-            self.S_CURSOR_UNUSED: T_SURFACE = None
+            # TODO: Add inpect cursor
+            self.S_CURSOR_INSPECT: T_SURFACE = None
+        else:
+            self.S_CURSOR_STANDARD: T_SURFACE = None
+            self.S_CURSOR_INVENTORY: T_SURFACE = None
+            self.S_CURSOR_INSPECT: T_SURFACE = None
+            self.S_CURSOR_UNUSED: T_SURFACE = None
+
+
+#   ___  _     _           _
+#  / _ \| |__ (_) ___  ___| |_ ___
+# | | | | '_ \| |/ _ \/ __| __/ __|
+# | |_| | |_) | |  __/ (__| |_\__ \
+#  \___/|_.__// |\___|\___|\__|___/
+#           |__/
+
+
+class obj_Actor:
+    """The actor object represents every entity in the game that
+    'interacts' with the player or the environment in some way.  It
+    is made up of components which alter an actors behavior.
+
+    # Arguments
+    x : starting x position on the current map
+
+    y : starting y position on the current map
+
+    name_object : string containing the name of the object, "chair" or
+    "goblin" for example.
+
+    animation : a list of images that make up the object's
+   spritesheet. Created within the struc_Assets class.
+
+    obj_Actor.animation_speed : time in seconds it takes to loop through
+    the object animation.
+
+    animation_phase : time in seconds the animation is ahead of the other
+    actors.  Actors with the same animation length, speed and phase always
+    show the same image of their animation.
+
+    # Properties
+    obj_Actor.sprite_image : the current image of the animation that
+    is being displayed.  0 is first image, 1 is second, etc.  It is
+    derived from ANIMATION_CLOCK.
+
+    obj_Actor.current_index : the obj_ActorIndex this actor is registered
+    in.  Moving the actor or changing its components keeps the index in sync.
+
+    # Components
+    obj_Actor.creature : any object that has health, and generally can fight.
+
+    obj_Actor.ai : ai is a component that is basically a function that is
+    executed every time the object is able to act.  Usually only on creatures.
+
+    obj_Actor.container : containers are objects that can hold an inventory.
+    obj_Actor.item : items are items that are able to be picked up and used.
+
+    obj_Actor.light : lights light up the tiles around the actor.
+
+    # Methods
+    obj_Actor.draw() : this method draws the object to the screen."""
+
+    def __init__(self, x: int, y: int, name_object: str, animation: List[T_SURFACE], animation_speed: float = 1.0,
+                 creature: T_CREATURE = None, ai: T_AI = None, item: T_ITEM = None, container: T_CONTAINER = None,
+                 animation_phase: float = 0.0, light: T_LIGHT = None):
+        self.current_index: T_ACTOR_INDEX = None
+
+        self._x: int = x
+        self._y: int = y
+
+        self.animation: List[T_SURFACE] = animation
+        self.animation_speed: float = animation_speed  # in seconds (for the entire animation)
+        self.animation_phase: float = animation_phase  # in seconds
+
+        self.name_object: str = name_object
+
+        self._creature: T_CREATURE = None
+        self._item: T_ITEM = None
+        self._container: T_CONTAINER = None
+        self._ai: T_AI = None
+        self._light: T_LIGHT = None
+
+        self.creature = creature
+        self.ai = ai
+        self.item = item
+        self.container = container
+        self.light = light
+
+    def draw(self) -> Tuple[T_SURFACE, T_RECT]:
+        """Draws the actor on the screen. If it is an animation, it loops through the entire animation over
+        self.animation_speed seconds
+
+        Returns the image drawn and where it was drawn, or None if the actor is not visible."""
+        current_frame = self.sprite()
+
+        if current_frame is not None:
+            # SURFACE_MAIN.blit(current_frame, (self.x * CELL_WIDTH, self.y * CELL_HEIGHT))
+            return current_frame, draw_surface(current_frame, SURFACE_MAIN, CAMERA.world_to_screen(self.x, self.y))
+
+        return None
+
+    def sprite(self) -> T_SURFACE:
+        """Returns the image of the actor to draw this frame, or None if the actor is not visible."""
+        if not map_is_in_fov(self.x, self.y):
+            return None
+
+        if self._animation_length == 1:
+            return self.animation[0]
+
+        return self.animation[self.sprite_image]
+
+    @property
+    def sprite_image(self) -> int:
+        return ANIMATION_CLOCK.frame_index(self._animation_length, self.animation_speed, self.animation_phase)
+
+    @property
+    def animation(self) -> List[T_SURFACE]:
+        return self._animation
+
+    @animation.setter
+    def animation(self, value: List[T_SURFACE]):
+        self._animation = value
+        self._animation_length = len(value)
+
+    @property
+    def x(self) -> int:
+        return self._x
+
+    @x.setter
+    def x(self, value: int):
+        if self.current_index is not None:
+            self.current_index.relocate(self, (self._x, self._y), (value, self._y))
+        self._x = value
+
+    @property
+    def y(self) -> int:
+        return self._y
+
+    @y.setter
+    def y(self, value: int):
+        if self.current_index is not None:
+            self.current_index.relocate(self, (self._x, self._y), (self._x, value))
+        self._y = value
+
+    @property
+    def pos(self) -> T_COORDINATE:
+        return self._x, self._y
+
+    @pos.setter
+    def pos(self, value: T_COORDINATE):
+        if self.current_index is not None:
+            self.current_index.relocate(self, (self._x, self._y), (value[0], value[1]))
+        self._x = value[0]
+        self._y = value[1]
+
+    @property
+    def creature(self) -> T_CREATURE:
+        return self._creature
+
+    @creature.setter
+    def creature(self, value: T_CREATURE):
+        if value is None:
+            if self._creature is not None:
+                self._creature.owner = None
+                self._creature = None
+        else:
+            if self._creature is None:
+                self._creature = value
+                self._creature.owner = self
+            else:
+                self._creature.owner = None
+                self._creature = value
+                self._creature.owner = self
+
+        if self.current_index is not None:
+            self.current_index.update_components(self)
+
+    @property
+    def item(self) -> T_ITEM:
+        return self._item
+
+    @item.setter
+    def item(self, value: T_ITEM):
+        if value is None:
+            if self._item is not None:
+                self._item.owner = None
+                self._item = None
+        else:
+            if self._item is None:
+                self._item = value
+                self._item.owner = self
+            else:
+                self._item.owner = None
+                self._item = value
+                self._item.owner = self
+
+        if self.current_index is not None:
+            self.current_index.update_components(self)
+
+    @property
+    def container(self) -> T_CONTAINER:
+        return self._container
+
+    @container.setter
+    def container(self, value: T_CONTAINER):
+        if value is None:
+            if self._container is not None:
+                self._container.owner = None
+                self._container = None
+        else:
+            if self._container is None:
+                self._container = value
+                self._container.owner = self
+            else:
+                self._container.owner = None
+                self._container = value
+                self._container.owner = self
+
+        if self.current_index is not None:
+            self.current_index.update_components(self)
+
+    @property
+    def ai(self) -> T_AI:
+        return self._ai
+
+    @ai.setter
+    def ai(self, value: T_AI):
+        if value is None:
+            if self._ai is not None:
+                self._ai.owner = None
+                self._ai = None
+        else:
+            if self._ai is None:
+                self._ai = value
+                self._ai.owner = self
+            else:
+                self._ai.owner = None
+                self._ai = value
+                self._ai.owner = self
+
+        if self.current_index is not None:
+            self.current_index.update_components(self)
+
+    @property
+    def light(self) -> T_LIGHT:
+        return self._light
+
+    @light.setter
+    def light(self, value: T_LIGHT):
+        if value is None:
+            if self._light is not None:
+                self._light.owner = None
+                self._light = None
+        else:
+            if self._light is None:
+                self._light = value
+                self._light.owner = self
+            else:
+                self._light.owner = None
+                self._light = value
+                self._light.owner = self
+
+        if self.current_index is not None:
+            self.current_index.update_components(self)
+
+    def distance_to(self, other: T_ACTOR) -> float:
+        dx = other.x - self.x
+        dy = other.y - self.y
+        return ((dx ** 2) + (dy ** 2)) ** 0.5
+
+    def __del__(self):
+        self.creature = None
+        self.item = None
+        self.container = None
+        self.ai = None
+        self.light = None
+
+
+class obj_Game:
+    """The obj_Game is an object that stores all the information used by
+    the game to 'keep track' of progress.  It will track maps, object lists,
+    and game history or record of messages.
+
+    # Properties
+    obj_Game.current_map : whatever map is currently loaded.
+
+    obj_Game.current_objects : obj_ActorIndex of the objects for the current map.
+
+    obj_Game.message_history : list of messages that have been pushed
+    to the player over the course of a game.
+
+    obj_Game.chase_field : obj_DistanceField towards the player, shared by
+    every monster that chases the player.
+
+    obj_Game.path_finder : obj_PathFinder that finds and caches paths on the current map."""
+
+    def __init__(self):
+        self.current_map = map_create()
+        self.current_objects: obj_ActorIndex = obj_ActorIndex()
+        self.chase_field: obj_DistanceField = obj_DistanceField()
+        self.path_finder: obj_PathFinder = obj_PathFinder()
+
+        self.message_history: List[T_MESSAGE] = []
+
+
+class obj_Map:
+    """The map object stores the tiles of a map as a structure of arrays.
+    Every property of a tile is kept in its own NumPy array indexed
+    [x, y], so that operations over the whole map can be vectorized.
+
+    For compatibility, map[x][y] returns a struc_Tile that reads and
+    writes these arrays.
+
+    # Arguments
+    width : The width of the map in tiles.
+
+    height : The height of the map in tiles.
+
+    # Properties
+    obj_Map.block_path : boolean array, TRUE where a tile prevents actors
+    from moving through it.
+
+    obj_Map.explored : boolean array, TRUE where the player has seen the tile before.
+
+    obj_Map.transparent : boolean array, the FOV layer.  TRUE where a tile
+    lets light through.  Kept in sync with block_path by set_block_path.
+
+    obj_Map.visible : boolean array, TRUE where a tile was in the field of
+    view the last time compute_fov was called.  The same array is reused
+    between calls.
+
+    obj_Map.version : counter increased every time the terrain changes, so
+    anything computed from the terrain knows when it is out of date.
+
+    obj_Map.changes : deque of the last (version, (x, y)) terrain changes
+    made with set_block_path, used to tell which tiles changed since a version.
+
+    obj_Map.fov_version : counter increased every time compute_fov or set_explored is called.
+
+    obj_Map.fov_changes : deque of the last (fov_version, rectangles) changes of the
+    visible or explored tiles, where rectangles are the (x0, y0, x1, y1) of the tiles that
+    may have changed (the previous and the new field of view for compute_fov).
+
+    # Methods
+    obj_Map.in_bounds : returns TRUE if the coordinates are within the map.
+
+    obj_Map.tile : returns the struc_Tile at the coordinates.
+
+    obj_Map.is_blocked : returns TRUE if the tile blocks movement.
+
+    obj_Map.is_visible : returns TRUE if the tile is in the field of view.
+
+    obj_Map.is_explored : returns TRUE if the player has seen the tile before.
+
+    obj_Map.set_block_path : changes whether a single tile blocks movement,
+    updating only that cell of the FOV layer.
+
+    obj_Map.set_explored : changes whether a single tile was seen before.
+
+    obj_Map.compute_fov : computes the field of view from a tile and
+    marks the tiles in it as explored.
+
+    obj_Map.get_region : returns the block_path, explored and visible
+    arrays of a rectangle of tiles."""
+
+    def __init__(self, width: int, height: int):
+        self.width = width
+        self.height = height
+
+        self.block_path: np.ndarray = np.zeros((width, height), dtype=bool)
+        self.explored: np.ndarray = np.zeros((width, height), dtype=bool)
+
+        self.transparent: np.ndarray = np.ones((width, height), dtype=bool)
+        self.visible: np.ndarray = np.zeros((width, height), dtype=bool)
+
+        self.version: int = 0
+        self.changes: deque = deque(maxlen=MAP_CHANGE_LOG_SIZE)
+
+        self.fov_version: int = 0
+        self.fov_changes: deque = deque(maxlen=MAP_CHANGE_LOG_SIZE)
+
+        # Area of self.visible written by the last compute_fov
+        self._fov_window: Tuple[slice, slice] = (slice(0, 0), slice(0, 0))
+
+    def in_bounds(self, x: int, y: int) -> bool:
+        return 0 <= x < self.width and 0 <= y < self.height
+
+    def tile(self, x: int, y: int) -> struc_Tile:
+        return struc_Tile(self, x, y)
+
+    def is_blocked(self, x: int, y: int) -> bool:
+        """Returns TRUE if the tile blocks movement. Tiles outside the map count as blocked."""
+        if not self.in_bounds(x, y):
+            return True
+
+        return bool(self.block_path[x, y])
+
+    def is_visible(self, x: int, y: int) -> bool:
+        if not self.in_bounds(x, y):
+            return False
+
+        return bool(self.visible[x, y])
+
+    def is_explored(self, x: int, y: int) -> bool:
+        if not self.in_bounds(x, y):
+            return False
+
+        return bool(self.explored[x, y])
+
+    def set_block_path(self, x: int, y: int, value: bool):
+        """Changes whether the tile blocks movement and light.
+
+        # Arguments
+        x : The x coordinate of the tile.
+
+        y : The y coordinate of the tile.
+
+        value : TRUE if the tile should block movement."""
+        self.block_path[x, y] = value
+        self.transparent[x, y] = not value
+        self.version += 1
+        self.changes.append((self.version, (x, y)))
+
+    def set_explored(self, x: int, y: int, value: bool):
+        """Changes whether the player has seen the tile before.
+
+        # Arguments
+        x : The x coordinate of the tile.
+
+        y : The y coordinate of the tile.
+
+        value : TRUE if the tile should be explored."""
+        self.explored[x, y] = value
+        self.fov_version += 1
+        self.fov_changes.append((self.fov_version, ((x, y, x + 1, y + 1),)))
+
+    def compute_fov(self, x: int, y: int, radius: int = 0, light_walls: bool = True,
+                    algorithm: int = FOV_ALGO) -> np.ndarray:
+        """Computes the field of view from a tile and returns self.visible.
+
+        Only the square of tiles within the radius is passed to libtcod, so
+        the cost depends on the radius and not on the size of the map.
+
+        # Arguments
+        x : The x coordinate of the point of view.
+
+        y : The y coordinate of the point of view.
+
+        radius : How far the field of view reaches. 0 means the whole map.
+
+        light_walls : If TRUE, walls at the edge of the field of view are visible.
+
+        algorithm : The libtcod FOV algorithm to use."""
+        # Clear the previous field of view
+        self.visible[self._fov_window] = False
+        previous_x, previous_y = self._fov_window
+
+        if radius > 0:
+            window = (slice(max(x - radius, 0), min(x + radius + 1, self.width)),
+                      slice(max(y - radius, 0), min(y + radius + 1, self.height)))
+        else:
+            window = (slice(0, self.width), slice(0, self.height))
+
+        pov = (x - window[0].start, y - window[1].start)
+        self.visible[window] = libtcod.map.compute_fov(self.transparent[window], pov, radius,
+                                                       light_walls, algorithm)
+        self._fov_window = window
+
+        # Everything in the field of view is now explored
+        self.explored[window] |= self.visible[window]
+
+        self.fov_version += 1
+        self.fov_changes.append((self.fov_version, ((previous_x.start, previous_y.start, previous_x.stop, previous_y.stop),
+                                                    (window[0].start, window[1].start, window[0].stop, window[1].stop))))
+
+        return self.visible
+
+    def get_region(self, x0: int, y0: int, x1: int, y1: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Returns the block_path, explored and visible arrays of the tiles from (x0, y0) up to,
+        but not including, (x1, y1).  Tiles outside the map are blocked, unexplored and not visible.
+
+        The arrays are views into the map when the rectangle is within the map, copies otherwise."""
+        if x0 >= 0 and y0 >= 0 and x1 <= self.width and y1 <= self.height:
+            window = (slice(x0, x1), slice(y0, y1))
+            return self.block_path[window], self.explored[window], self.visible[window]
+
+        block_path = np.ones((x1 - x0, y1 - y0), dtype=bool)
+        explored = np.zeros((x1 - x0, y1 - y0), dtype=bool)
+        visible = np.zeros((x1 - x0, y1 - y0), dtype=bool)
+
+        inside_x0, inside_x1 = max(x0, 0), min(x1, self.width)
+        inside_y0, inside_y1 = max(y0, 0), min(y1, self.height)
+        if inside_x0 < inside_x1 and inside_y0 < inside_y1:
+            src = (slice(inside_x0, inside_x1), slice(inside_y0, inside_y1))
+            dest = (slice(inside_x0 - x0, inside_x1 - x0), slice(inside_y0 - y0, inside_y1 - y0))
+            block_path[dest] = self.block_path[src]
+            explored[dest] = self.explored[src]
+            visible[dest] = self.visible[src]
+
+        return block_path, explored, visible
+
+    def __getitem__(self, x: int) -> struc_MapColumn:
+        return struc_MapColumn(self, x)
+
+    def __len__(self) -> int:
+        return self.width
+
+
+class obj_ChunkedMap:
+    """The chunked map is a map without fixed bounds.  It is divided into
+    square chunks, each one an obj_Map, that are generated the first time
+    a tile in them is accessed (which happens around the player).
+
+    At most max_chunks chunks are kept in memory.  When more are needed
+    the least recently used chunk is evicted.  Its explored state (and its
+    terrain, if it was changed after generation) is kept packed into bits,
+    and is restored when the chunk is generated again.
+
+    All methods take global coordinates, and it offers the same methods as
+    obj_Map, so the rest of the game does not need to know which kind of
+    map is loaded.
+
+    # Arguments
+    generator : function (chunk_x, chunk_y, chunk_size, seed) that returns
+    an obj_Map of chunk_size x chunk_size tiles.  The same arguments must
+    always produce the same chunk.
+
+    chunk_size : The width and height of a chunk in tiles.
+
+    max_chunks : The maximum number of chunks kept in memory.
+
+    seed : The seed given to the generator.
+
+    # Properties
+    obj_ChunkedMap.chunks : OrderedDict mapping (chunk_x, chunk_y) to the
+    loaded chunks, from least to most recently used.
+
+    obj_ChunkedMap.archive : dictionary mapping (chunk_x, chunk_y) to the
+    packed state of evicted chunks.
+
+    obj_ChunkedMap.visible : boolean array of the field of view computed
+    by compute_fov, starting at obj_ChunkedMap.visible_origin.
+
+    obj_ChunkedMap.version : counter increased every time the terrain changes.
+
+    obj_ChunkedMap.changes : deque of the last (version, (x, y)) terrain changes.
+
+    obj_ChunkedMap.fov_version : counter increased every time compute_fov or set_explored is called.
+
+    obj_ChunkedMap.fov_changes : deque of the last (fov_version, rectangles) changes of the
+    visible or explored tiles, where rectangles are the (x0, y0, x1, y1) of the tiles that
+    may have changed (the previous and the new field of view for compute_fov).
+
+    # Methods
+    obj_ChunkedMap.get_chunk : returns a chunk, generating or restoring it if needed."""
+
+    def __init__(self, generator: Callable, chunk_size: int = CHUNK_SIZE, max_chunks: int = CHUNK_CACHE_SIZE,
+                 seed: int = 0):
+        self.generator = generator
+        self.chunk_size = chunk_size
+        self.max_chunks = max_chunks
+        self.seed = seed
+
+        self.chunks: OrderedDict[T_COORDINATE, obj_Map] = OrderedDict()
+        self.archive: Dict[T_COORDINATE, Tuple[np.ndarray, np.ndarray]] = {}
+        # Chunks whose terrain changed since they were generated
+        self._modified_chunks = set()
+
+        self.visible: np.ndarray = np.zeros((0, 0), dtype=bool)
+        self.visible_origin: T_COORDINATE = (0, 0)
+
+        self.version: int = 0
+        self.changes: deque = deque(maxlen=MAP_CHANGE_LOG_SIZE)
+
+        self.fov_version: int = 0
+        self.fov_changes: deque = deque(maxlen=MAP_CHANGE_LOG_SIZE)
+
+    def get_chunk(self, chunk_x: int, chunk_y: int) -> obj_Map:
+        """Returns the chunk, generating it (and restoring its archived state) on first access.
+
+        # Arguments
+        chunk_x : The x coordinate of the chunk (global x // chunk_size).
+
+        chunk_y : The y coordinate of the chunk (global y // chunk_size)."""
+        key = (chunk_x, chunk_y)
+        chunk = self.chunks.get(key)
+        if chunk is not None:
+            self.chunks.move_to_end(key)
+            return chunk
+
+        chunk = self.generator(chunk_x, chunk_y, self.chunk_size, self.seed)
+
+        if key in self.archive:
+            packed_explored, packed_block_path = self.archive.pop(key)
+            chunk.explored[:] = self._unpack(packed_explored)
+            if packed_block_path is not None:
+                chunk.block_path[:] = self._unpack(packed_block_path)
+                self._modified_chunks.add(key)
+
+        map_make_fov(chunk)
+        self.chunks[key] = chunk
+
+        while len(self.chunks) > self.max_chunks:
+            self._evict(*self.chunks.popitem(last=False))
+
+        return chunk
+
+    def _evict(self, key: T_COORDINATE, chunk: obj_Map):
+        if key in self._modified_chunks:
+            self._modified_chunks.discard(key)
+            packed_block_path = np.packbits(chunk.block_path)
+        else:
+            # Unchanged terrain is generated again from the seed
+            packed_block_path = None
+
+        self.archive[key] = (np.packbits(chunk.explored), packed_block_path)
+
+    def _unpack(self, packed: np.ndarray) -> np.ndarray:
+        size = self.chunk_size
+        return np.unpackbits(packed, count=size * size).reshape(size, size).astype(bool)
+
+    def _overlapping_chunks(self, x0: int, y0: int, x1: int, y1: int):
+        """Yields (chunk, chunk_window, region_window) for every chunk overlapping the rectangle
+        from (x0, y0) up to (x1, y1), where the windows are the overlapping slices in the chunk
+        and in the rectangle."""
+        size = self.chunk_size
+        for chunk_x in range(x0 // size, (x1 - 1) // size + 1):
+            for chunk_y in range(y0 // size, (y1 - 1) // size + 1):
+                left, top = chunk_x * size, chunk_y * size
+                inside_x0, inside_x1 = max(x0, left), min(x1, left + size)
+                inside_y0, inside_y1 = max(y0, top), min(y1, top + size)
+
+                chunk_window = (slice(inside_x0 - left, inside_x1 - left), slice(inside_y0 - top, inside_y1 - top))
+                region_window = (slice(inside_x0 - x0, inside_x1 - x0), slice(inside_y0 - y0, inside_y1 - y0))
+                yield self.get_chunk(chunk_x, chunk_y), chunk_window, region_window
+
+    def in_bounds(self, x: int, y: int) -> bool:
+        return True
+
+    def tile(self, x: int, y: int) -> struc_Tile:
+        return struc_Tile(self, x, y)
+
+    def is_blocked(self, x: int, y: int) -> bool:
+        chunk = self.get_chunk(x // self.chunk_size, y // self.chunk_size)
+        return bool(chunk.block_path[x % self.chunk_size, y % self.chunk_size])
+
+    def is_visible(self, x: int, y: int) -> bool:
+        local_x = x - self.visible_origin[0]
+        local_y = y - self.visible_origin[1]
+        width, height = self.visible.shape
+
+        return 0 <= local_x < width and 0 <= local_y < height and bool(self.visible[local_x, local_y])
+
+    def is_explored(self, x: int, y: int) -> bool:
+        chunk = self.get_chunk(x // self.chunk_size, y // self.chunk_size)
+        return bool(chunk.explored[x % self.chunk_size, y % self.chunk_size])
+
+    def set_block_path(self, x: int, y: int, value: bool):
+        chunk_x, chunk_y = x // self.chunk_size, y // self.chunk_size
+        self.get_chunk(chunk_x, chunk_y).set_block_path(x % self.chunk_size, y % self.chunk_size, value)
+        self._modified_chunks.add((chunk_x, chunk_y))
+        self.version += 1
+        self.changes.append((self.version, (x, y)))
+
+    def set_explored(self, x: int, y: int, value: bool):
+        chunk = self.get_chunk(x // self.chunk_size, y // self.chunk_size)
+        chunk.set_explored(x % self.chunk_size, y % self.chunk_size, value)
+        self.fov_version += 1
+        self.fov_changes.append((self.fov_version, ((x, y, x + 1, y + 1),)))
+
+    def compute_fov(self, x: int, y: int, radius: int = 0, light_walls: bool = True,
+                    algorithm: int = FOV_ALGO) -> np.ndarray:
+        """Computes the field of view from a tile and returns self.visible, which starts at
+        self.visible_origin.
+
+        # Arguments
+        x : The x coordinate of the point of view.
+
+        y : The y coordinate of the point of view.
+
+        radius : How far the field of view reaches. As the map has no bounds, 0 means chunk_size.
+
+        light_walls : If TRUE, walls at the edge of the field of view are visible.
+
+        algorithm : The libtcod FOV algorithm to use."""
+        if radius <= 0:
+            radius = self.chunk_size
+
+        x0, y0 = x - radius, y - radius
+        x1, y1 = x + radius + 1, y + radius + 1
+
+        transparent = np.zeros((x1 - x0, y1 - y0), dtype=bool)
+        for chunk, chunk_window, region_window in self._overlapping_chunks(x0, y0, x1, y1):
+            transparent[region_window] = chunk.transparent[chunk_window]
+
+        previous_x0, previous_y0 = self.visible_origin
+        previous_x1, previous_y1 = previous_x0 + self.visible.shape[0], previous_y0 + self.visible.shape[1]
+
+        self.visible = libtcod.map.compute_fov(transparent, (radius, radius), radius, light_walls, algorithm)
+        self.visible_origin = (x0, y0)
+
+        # Everything in the field of view is now explored
+        for chunk, chunk_window, region_window in self._overlapping_chunks(x0, y0, x1, y1):
+            chunk.explored[chunk_window] |= self.visible[region_window]
+
+        self.fov_version += 1
+        self.fov_changes.append((self.fov_version, ((previous_x0, previous_y0, previous_x1, previous_y1),
+                                                    (x0, y0, x1, y1))))
+
+        return self.visible
+
+    def get_region(self, x0: int, y0: int, x1: int, y1: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Returns copies of the block_path, explored and visible arrays of the tiles from (x0, y0)
+        up to, but not including, (x1, y1)."""
+        block_path = np.empty((x1 - x0, y1 - y0), dtype=bool)
+        explored = np.empty((x1 - x0, y1 - y0), dtype=bool)
+        for chunk, chunk_window, region_window in self._overlapping_chunks(x0, y0, x1, y1):
+            block_path[region_window] = chunk.block_path[chunk_window]
+            explored[region_window] = chunk.explored[chunk_window]
+
+        visible = np.zeros((x1 - x0, y1 - y0), dtype=bool)
+        visible_x0, visible_y0 = self.visible_origin
+        visible_x1 = visible_x0 + self.visible.shape[0]
+        visible_y1 = visible_y0 + self.visible.shape[1]
+        inside_x0, inside_x1 = max(x0, visible_x0), min(x1, visible_x1)
+        inside_y0, inside_y1 = max(y0, visible_y0), min(y1, visible_y1)
+        if inside_x0 < inside_x1 and inside_y0 < inside_y1:
+            visible[inside_x0 - x0:inside_x1 - x0, inside_y0 - y0:inside_y1 - y0] = \
+                self.visible[inside_x0 - visible_x0:inside_x1 - visible_x0,
+                             inside_y0 - visible_y0:inside_y1 - visible_y0]
+
+        return block_path, explored, visible
+
+    def __getitem__(self, x: int) -> struc_MapColumn:
+        return struc_MapColumn(self, x)
+
+
+class obj_DistanceField:
+    """The distance field stores, for every tile around a target, the walking
+    distance to that target (a Dijkstra map).  It is computed once and
+    shared, so any number of actors can walk towards the target by stepping
+    to the neighbouring tile with the lowest distance.
+
+    Moves cost 2 orthogonally and 3 diagonally. The field only covers the
+    tiles within radius of the target.
+
+    # Arguments
+    radius : How many tiles around the target the field covers.
+
+    # Properties
+    obj_DistanceField.distance : int32 array of distances, starting at
+    obj_DistanceField.origin.  Unreachable tiles hold UNREACHABLE.
+
+    obj_DistanceField.target : the coordinates the field leads to.
+
+    # Methods
+    obj_DistanceField.update : recomputes the field if the target moved
+    or the terrain changed.
+
+    obj_DistanceField.step_from : returns the direction to walk from a tile."""
+
+    UNREACHABLE = np.iinfo(np.int32).max
+    NEIGHBOURS = ((-1, -1), (0, -1), (1, -1), (-1, 0), (1, 0), (-1, 1), (0, 1), (1, 1))
+
+    def __init__(self, radius: int = FLOW_FIELD_RADIUS):
+        self.radius = radius
+
+        self.distance: np.ndarray = np.zeros((0, 0), dtype=np.int32)
+        self.origin: T_COORDINATE = (0, 0)
+        self.target: T_COORDINATE = None
+
+        # The map and map version the field was computed for
+        self._map: T_MAP = None
+        self._map_version: int = -1
+
+    def update(self, incoming_map: T_MAP, target: T_COORDINATE) -> np.ndarray:
+        """Recomputes the field towards the target, unless it is already up to date.
+
+        # Arguments
+        incoming_map : The map to walk on.
+
+        target : The coordinates to walk to."""
+        if incoming_map is self._map and incoming_map.version == self._map_version and target == self.target:
+            return self.distance
+
+        target_x, target_y = target
+        x0, y0 = target_x - self.radius, target_y - self.radius
+        block_path = incoming_map.get_region(x0, y0, target_x + self.radius + 1, target_y + self.radius + 1)[0]
+
+        self.distance = np.full(block_path.shape, self.UNREACHABLE, dtype=np.int32)
+        self.distance[self.radius, self.radius] = 0
+        libtcod.path.dijkstra2d(self.distance, (~block_path).astype(np.int8), 2, 3, out=self.distance)
+
+        self.origin = (x0, y0)
+        self.target = target
+        self._map = incoming_map
+        self._map_version = incoming_map.version
+
+        return self.distance
+
+    def get(self, x: int, y: int) -> int:
+        """Returns the distance from the tile to the target, or UNREACHABLE."""
+        local_x, local_y = x - self.origin[0], y - self.origin[1]
+        width, height = self.distance.shape
+
+        if 0 <= local_x < width and 0 <= local_y < height:
+            return int(self.distance[local_x, local_y])
+
+        return self.UNREACHABLE
+
+    def step_from(self, x: int, y: int, is_free: Callable[[int, int], bool] = None) -> T_COORDINATE:
+        """Returns the direction (dx, dy) towards the neighbouring tile closest to the target,
+        or None if there is no tile closer than the current one.
+
+        # Arguments
+        x : The x coordinate to step from.
+
+        y : The y coordinate to step from.
+
+        is_free : If given, a function (x, y) that returns FALSE for tiles that should not be stepped on."""
+        best_distance = self.get(x, y)
+        best_step = None
+
+        for dx, dy in self.NEIGHBOURS:
+            distance = self.get(x + dx, y + dy)
+            if distance < best_distance and (is_free is None or is_free(x + dx, y + dy)):
+                best_distance = distance
+                best_step = (dx, dy)
+
+        return best_step
+
+
+class struc_CachedPath:
+    """This class functions as a struct for a path stored by obj_PathFinder.
+
+    # Properties
+    struc_CachedPath.tiles : tuple of the coordinates of the path, from the start to the goal.
+
+    struc_CachedPath.tile_set : the same coordinates as a set, to check if a tile is on the path.
+
+    struc_CachedPath.version : the map version the path is known to be valid for."""
+
+    __slots__ = ("tiles", "tile_set", "version")
+
+    def __init__(self, tiles: Tuple[T_COORDINATE, ...], version: int):
+        self.tiles = tiles
+        self.tile_set = frozenset(tiles)
+        self.version = version
+
+
+class obj_PathFinder:
+    """The path finder finds the shortest path between two tiles with A*,
+    moving orthogonally or diagonally.  Walls can not be crossed, and
+    creatures are soft obstacles that make a tile more expensive (by
+    PATH_ACTOR_COST) instead of blocking it.
+
+    Found paths are cached by (start, goal).  A cached path also answers
+    queries starting from any tile along it, with the rest of the path.  A
+    cached path stays valid when the map version changes, as long as none
+    of the tiles that changed are on the path.  Creatures moving do not
+    invalidate paths.
+
+    # Arguments
+    cost_function : function (block_path) that returns the cost of walking
+    on each tile of a region as an integer array, 0 for tiles that can not
+    be walked on.  Defaults to 1 for every tile without a wall.
+
+    max_paths : The maximum number of paths kept in the cache.
+
+    # Properties
+    obj_PathFinder.paths : OrderedDict mapping (start, goal) to the cached
+    struc_CachedPath, from least to most recently used.
+
+    obj_PathFinder.hits / misses : how many queries were answered from the
+    cache or had to be computed.
+
+    # Methods
+    obj_PathFinder.find_path : returns the path between two tiles."""
+
+    def __init__(self, cost_function: Callable[[np.ndarray], np.ndarray] = None,
+                 max_paths: int = PATH_CACHE_SIZE):
+        self.cost_function = cost_function
+        self.max_paths = max_paths
+
+        self.paths: OrderedDict[Tuple[T_COORDINATE, T_COORDINATE], struc_CachedPath] = OrderedDict()
+        # (tile, goal) -> (cached path, position of the tile on it), to reuse the end of paths
+        self._suffixes: Dict[Tuple[T_COORDINATE, T_COORDINATE], Tuple[struc_CachedPath, int]] = {}
+
+        self._map: T_MAP = None
+
+        self.hits: int = 0
+        self.misses: int = 0
+
+    def find_path(self, incoming_map: T_MAP, start: T_COORDINATE, goal: T_COORDINATE,
+                  actors: T_ACTOR_INDEX = None) -> List[T_COORDINATE]:
+        """Returns the list of tiles to walk through to go from start to goal, not including
+        the start.  Returns an empty list if there is no path.
+
+        # Arguments
+        incoming_map : The map to walk on.
+
+        start : The coordinates to start from.
+
+        goal : The coordinates to go to.
+
+        actors : If given, the creatures in this obj_ActorIndex are soft obstacles."""
+        if incoming_map is not self._map:
+            self.clear()
+            self._map = incoming_map
+
+        if start == goal:
+            return []
+
+        cached = self._get_cached(incoming_map, start, goal)
+        if cached is not None:
+            self.hits += 1
+            return cached
+
+        self.misses += 1
+        tiles = self._search(incoming_map, start, goal, actors)
+        if not tiles:
+            return []
+
+        self._store(struc_CachedPath(tiles, incoming_map.version))
+
+        return list(tiles[1:])
+
+    def clear(self):
+        self.paths.clear()
+        self._suffixes.clear()
+
+    def _get_cached(self, incoming_map: T_MAP, start: T_COORDINATE, goal: T_COORDINATE) -> List[T_COORDINATE]:
+        cached_path = self.paths.get((start, goal))
+        position = 0
+        if cached_path is None:
+            cached_path, position = self._suffixes.get((start, goal), (None, 0))
+            if cached_path is None:
+                return None
+
+        if not self._is_valid(incoming_map, cached_path):
+            self._discard(cached_path)
+            return None
+
+        self.paths.move_to_end((cached_path.tiles[0], goal))
+
+        return list(cached_path.tiles[position + 1:])
+
+    def _is_valid(self, incoming_map: T_MAP, cached_path: struc_CachedPath) -> bool:
+        """Returns TRUE if none of the tiles changed since the path was found are on the path."""
+        if cached_path.version == incoming_map.version:
+            return True
+
+        changes = incoming_map.changes
+        if not changes or changes[0][0] > cached_path.version + 1:
+            # Some of the changes are not in the log anymore
+            return False
+
+        for version, coords in reversed(changes):
+            if version <= cached_path.version:
+                break
+            if coords in cached_path.tile_set:
+                return False
+
+        cached_path.version = incoming_map.version
+        return True
+
+    def _search(self, incoming_map: T_MAP, start: T_COORDINATE, goal: T_COORDINATE,
+                actors: T_ACTOR_INDEX) -> Tuple[T_COORDINATE, ...]:
+        """Runs A* over the box around start and goal (extended by PATH_SEARCH_MARGIN) and returns
+        the path including the start, or an empty tuple."""
+        x0 = min(start[0], goal[0]) - PATH_SEARCH_MARGIN
+        y0 = min(start[1], goal[1]) - PATH_SEARCH_MARGIN
+        x1 = max(start[0], goal[0]) + PATH_SEARCH_MARGIN + 1
+        y1 = max(start[1], goal[1]) + PATH_SEARCH_MARGIN + 1
+
+        block_path = incoming_map.get_region(x0, y0, x1, y1)[0]
+        if self.cost_function is None:
+            cost = (~block_path).astype(np.int32)
+        else:
+            cost = np.asarray(self.cost_function(block_path), dtype=np.int32)
+
+        if actors is not None:
+            for actor in actors.with_component("creature"):
+                local_x, local_y = actor.x - x0, actor.y - y0
+                if 0 <= local_x < x1 - x0 and 0 <= local_y < y1 - y0 and cost[local_x, local_y] > 0:
+                    cost[local_x, local_y] += PATH_ACTOR_COST
+
+        # The start may be occupied, and the goal may be a creature to reach
+        cost[start[0] - x0, start[1] - y0] = max(cost[start[0] - x0, start[1] - y0], 1)
+
+        graph = libtcod.path.SimpleGraph(cost=cost, cardinal=2, diagonal=3)
+        graph.set_heuristic(cardinal=2, diagonal=3)
+        pathfinder = libtcod.path.Pathfinder(graph)
+        pathfinder.add_root((start[0] - x0, start[1] - y0))
+        local_path = pathfinder.path_to((goal[0] - x0, goal[1] - y0))
+
+        if len(local_path) < 2 or tuple(local_path[0]) != (start[0] - x0, start[1] - y0):
+            return ()
+
+        return tuple((int(x) + x0, int(y) + y0) for x, y in local_path)
+
+    def _store(self, cached_path: struc_CachedPath):
+        key = (cached_path.tiles[0], cached_path.tiles[-1])
+        if key in self.paths:
+            self._discard(self.paths[key])
+
+        self.paths[key] = cached_path
+        goal = cached_path.tiles[-1]
+        for position, tile in enumerate(cached_path.tiles[1:-1], start=1):
+            self._suffixes[(tile, goal)] = (cached_path, position)
+
+        while len(self.paths) > self.max_paths:
+            self._discard(next(iter(self.paths.values())))
+
+    def _discard(self, cached_path: struc_CachedPath):
+        goal = cached_path.tiles[-1]
+        self.paths.pop((cached_path.tiles[0], goal), None)
+
+        for tile in cached_path.tiles[1:-1]:
+            if self._suffixes.get((tile, goal), (None,))[0] is cached_path:
+                del self._suffixes[(tile, goal)]
+
+
+class obj_ActorIndex:
+    """The actor index holds every actor on a map and indexes them by
+    tile and by component, so that looking up the actors on a tile does
+    not require scanning every actor.  It behaves like the list of actors
+    it replaces (append, extend, remove, iteration, len and 'in').
+
+    Actors register themselves through obj_Actor.current_index, and
+    report any change of position or components back to the index.
+
+    # Arguments
+    actors : If given, a list of actors to add to the index.
+
+    # Properties
+    obj_ActorIndex.actors : ordered dictionary (used as a set) of every actor
+    in the index, in the order they were added.
+
+    obj_ActorIndex.tiles : dictionary mapping (x, y) to the list of actors
+    standing on that tile.
+
+    obj_ActorIndex.components : dictionary mapping a component name
+    ("creature", "item", "container", "ai") to the actors that have it.
+
+    # Methods
+    obj_ActorIndex.at : returns the actors standing on a tile.
+
+    obj_ActorIndex.with_component : returns the actors that have a component.
+
+    obj_ActorIndex.relocate : moves an actor from one tile to another.
+
+    obj_ActorIndex.update_components : re-buckets an actor after one of its
+    components changed."""
+
+    COMPONENTS = ("creature", "item", "container", "ai", "light")
+
+    def __init__(self, actors: List[obj_Actor] = None):
+        self.actors: Dict[obj_Actor, None] = {}
+        self.tiles: Dict[T_COORDINATE, List[obj_Actor]] = {}
+        self.components: Dict[str, Dict[obj_Actor, None]] = {name: {} for name in self.COMPONENTS}
+
+        if actors is not None:
+            self.extend(actors)
+
+    def append(self, actor: obj_Actor):
+        """Adds the actor to the index.
+
+        # Arguments
+        actor : The actor to add"""
+        if actor in self.actors:
+            return
+
+        if actor.current_index is not None:
+            actor.current_index.remove(actor)
+
+        self.actors[actor] = None
+        self.tiles.setdefault(actor.pos, []).append(actor)
+        actor.current_index = self
+        self.update_components(actor)
+
+    def extend(self, actors: List[obj_Actor]):
+        for actor in actors:
+            self.append(actor)
+
+    def remove(self, actor: obj_Actor):
+        """Removes the actor from the index. Raises a ValueError if the actor is not in the index.
+
+        # Arguments
+        actor : The actor to remove"""
+        if actor not in self.actors:
+            raise ValueError(f"{actor.name_object} is not in the actor index")
+
+        del self.actors[actor]
+        self._remove_from_tile(actor, actor.pos)
+        for bucket in self.components.values():
+            bucket.pop(actor, None)
+        actor.current_index = None
+
+    def at(self, x: int, y: int) -> List[obj_Actor]:
+        """Returns the actors standing on the tile. The returned list must not be modified.
+
+        # Arguments
+        x : The x coordinate of the tile.
+
+        y : The y coordinate of the tile."""
+        return self.tiles.get((x, y), [])
+
+    def with_component(self, component: str) -> List[obj_Actor]:
+        """Returns the actors that have the component.
+
+        # Arguments
+        component : The name of the component ("creature", "item", "container", "ai" or "light")."""
+        return list(self.components[component])
+
+    def relocate(self, actor: obj_Actor, old_coords: T_COORDINATE, new_coords: T_COORDINATE):
+        """Moves the actor from one tile to another within the index.
+
+        # Arguments
+        actor : The actor that moved.
+
+        old_coords : The coordinates the actor is leaving.
+
+        new_coords : The coordinates the actor is moving to."""
+        if old_coords == new_coords:
+            return
+
+        self._remove_from_tile(actor, old_coords)
+        self.tiles.setdefault(new_coords, []).append(actor)
+
+    def update_components(self, actor: obj_Actor):
+        """Updates the component buckets of the actor.
+
+        # Arguments
+        actor : The actor whose components changed."""
+        for name, bucket in self.components.items():
+            if getattr(actor, name) is not None:
+                bucket[actor] = None
+            else:
+                bucket.pop(actor, None)
+
+    def _remove_from_tile(self, actor: obj_Actor, coords: T_COORDINATE):
+        tile_actors = self.tiles[coords]
+        tile_actors.remove(actor)
+        if not tile_actors:
+            del self.tiles[coords]
+
+    def __iter__(self):
+        # Iterate over a copy so actors can be added or removed while looping
+        return iter(list(self.actors))
+
+    def __len__(self) -> int:
+        return len(self.actors)
+
+    def __contains__(self, actor: obj_Actor) -> bool:
+        return actor in self.actors
+
+
+class obj_Camera:
+    """The camera decides which part of the map is drawn on the screen.
+    It follows a target (usually the player), keeping it in the middle of
+    the screen, but does not scroll past the edges of bounded maps.
+
+    # Arguments
+    width : The width of the view in tiles.
+
+    height : The height of the view in tiles.
+
+    # Properties
+    obj_Camera.x, obj_Camera.y : the map coordinates of the tile at the
+    top left of the screen.
+
+    # Methods
+    obj_Camera.update : moves the camera to follow the target.
+
+    obj_Camera.world_to_screen : converts map coordinates into pixel coordinates on the screen.
+
+    obj_Camera.screen_to_world : converts pixel coordinates on the screen into map coordinates.
+
+    obj_Camera.contains : returns TRUE if the tile is on the screen."""
+
+    def __init__(self, width: int = CAMERA_WIDTH, height: int = CAMERA_HEIGHT):
+        self.width = width
+        self.height = height
+
+        self.x: int = 0
+        self.y: int = 0
+
+    def update(self, target: T_COORDINATE, incoming_map: T_MAP):
+        """Centers the camera on the target, within the edges of the map.
+
+        # Arguments
+        target : The coordinates to follow.
+
+        incoming_map : The map being shown."""
+        x = target[0] - self.width // 2
+        y = target[1] - self.height // 2
+
+        if not isinstance(incoming_map, obj_ChunkedMap):
+            x = max(0, min(x, incoming_map.width - self.width))
+            y = max(0, min(y, incoming_map.height - self.height))
+
+        self.x, self.y = x, y
+
+    @property
+    def origin(self) -> T_COORDINATE:
+        return self.x, self.y
+
+    @property
+    def rect(self) -> Tuple[int, int, int, int]:
+        """The tiles on screen as (x0, y0, x1, y1), x1 and y1 not included."""
+        return self.x, self.y, self.x + self.width, self.y + self.height
+
+    def world_to_screen(self, x: int, y: int) -> T_COORDINATE:
+        return (x - self.x) * CELL_WIDTH, (y - self.y) * CELL_HEIGHT
+
+    def screen_to_world(self, pixel_x: int, pixel_y: int) -> T_COORDINATE:
+        return pixel_x // CELL_WIDTH + self.x, pixel_y // CELL_HEIGHT + self.y
+
+    def contains(self, x: int, y: int) -> bool:
+        return self.x <= x < self.x + self.width and self.y <= y < self.y + self.height
+
+
+class obj_TerrainLayer:
+    """The terrain layer is a surface the size of the camera view with the
+    map already drawn on it, so a frame only needs to blit it once.
+
+    It remembers what it drew on every tile (unexplored, explored or
+    visible floor or wall), and on each update only repaints the tiles
+    whose state changed.  When the camera moves, the surface is scrolled
+    and only the newly uncovered tiles are painted.
+
+    # Arguments
+    width : The width of the layer in tiles.
+
+    height : The height of the layer in tiles.
+
+    # Properties
+    obj_TerrainLayer.surface : the surface with the terrain drawn on it.
+
+    obj_TerrainLayer.state : int8 array of what is drawn on every tile, -1 if it needs to be drawn.
+
+    # Methods
+    obj_TerrainLayer.update : repaints the tiles that changed and returns their rectangles on the
+    layer (the whole layer if it was scrolled).
+
+    obj_TerrainLayer.invalidate : makes the next update repaint every tile.
+
+    obj_TerrainLayer.tile_states : returns the state of every tile from the block_path, explored
+    and visible arrays."""
+
+    UNEXPLORED, EXPLORED_FLOOR, EXPLORED_WALL, VISIBLE_FLOOR, VISIBLE_WALL = range(5)
+
+    def __init__(self, width: int = CAMERA_WIDTH, height: int = CAMERA_HEIGHT):
+        self.width = width
+        self.height = height
+
+        self.surface: T_SURFACE = pygame.Surface((width * CELL_WIDTH, height * CELL_HEIGHT))
+        self.state: np.ndarray = np.full((width, height), -1, dtype=np.int8)
+
+        self._map: T_MAP = None
+        self._origin: T_COORDINATE = (0, 0)
+        self._tiles: Tuple[T_SURFACE, ...] = None
+
+    def invalidate(self):
+        self.state[:] = -1
+
+    def update(self, map_to_draw: T_MAP, camera: obj_Camera) -> List[pygame.Rect]:
+        """Brings the layer up to date with the map and returns the rectangles that were repainted.
+
+        # Arguments
+        map_to_draw : The map to draw.
+
+        camera : The camera the layer is drawn for."""
+        if map_to_draw is not self._map:
+            self._map = map_to_draw
+            self.invalidate()
+
+        scrolled = camera.origin != self._origin
+        if scrolled:
+            self._scroll(camera.x - self._origin[0], camera.y - self._origin[1])
+            self._origin = camera.origin
+
+        new_state = self.tile_states(*map_to_draw.get_region(*camera.rect))
+
+        changed_x, changed_y = np.nonzero(new_state != self.state)
+        self.state[:] = new_state
+
+        tiles = self._tile_images()
+        repainted = []
+        for x, y, tile_state in zip(changed_x.tolist(), changed_y.tolist(), new_state[changed_x, changed_y].tolist()):
+            tile_coords = (x * CELL_WIDTH, y * CELL_HEIGHT)
+            RENDER_QUEUE.add(tiles[tile_state], tile_coords)
+            repainted.append(pygame.Rect(tile_coords, CELL_SIZE))
+        RENDER_QUEUE.flush(self.surface)
+
+        if scrolled:
+            return [self.surface.get_rect()]
+
+        return repainted
+
+    @staticmethod
+    def tile_states(block_path: np.ndarray, explored: np.ndarray, visible: np.ndarray) -> np.ndarray:
+        """Returns the state (UNEXPLORED, EXPLORED_FLOOR...) of every tile, as an int8 array."""
+        state = np.where(visible, np.int8(obj_TerrainLayer.VISIBLE_FLOOR),
+                         np.where(explored, np.int8(obj_TerrainLayer.EXPLORED_FLOOR), np.int8(obj_TerrainLayer.UNEXPLORED)))
+        # The wall states follow the floor states
+        state += (visible | explored) & block_path
+
+        return state
+
+    def _tile_images(self) -> Tuple[T_SURFACE, ...]:
+        """Returns the opaque image of a tile for each state, the sprite drawn over the background color."""
+        if self._tiles is None:
+            sprites = (None, ASSETS.S_FLOOR_EXPLORED, ASSETS.S_WALL_EXPLORED, ASSETS.S_FLOOR, ASSETS.S_WALL)
+            tiles = []
+            for sprite in sprites:
+                tile = pygame.Surface(CELL_SIZE)
+                tile.fill(COLOR_DEFAULT_BG)
+                if sprite is not None:
+                    tile.blit(sprite, (0, 0))
+                tiles.append(tile)
+            self._tiles = tuple(tiles)
+
+        return self._tiles
+
+    def _scroll(self, dx: int, dy: int):
+        """Moves what is drawn by (dx, dy) tiles, marking the uncovered tiles to be drawn."""
+        if abs(dx) >= self.width or abs(dy) >= self.height:
+            self.invalidate()
+            return
+
+        self.surface.scroll(-dx * CELL_WIDTH, -dy * CELL_HEIGHT)
+
+        new_state = np.full_like(self.state, -1)
+        new_state[max(-dx, 0):self.width - max(dx, 0), max(-dy, 0):self.height - max(dy, 0)] = \
+            self.state[max(dx, 0):self.width - max(-dx, 0), max(dy, 0):self.height - max(-dy, 0)]
+        self.state = new_state
+
+
+class obj_RenderQueue:
+    """Collects the images to draw as (surface, position) pairs and draws
+    them all at once with a single Surface.blits call (Surface.fblits
+    where it exists), instead of one blit call per image.
+
+    # Properties
+    obj_RenderQueue.frame_sprites : how many images were drawn since the
+    start of the current frame.
+
+    obj_RenderQueue.last_frame_sprites : how many images were drawn in the
+    last complete frame.
+
+    # Methods
+    obj_RenderQueue.add : adds an image to draw.
+
+    obj_RenderQueue.flush : draws the images added on a surface.
+
+    obj_RenderQueue.end_frame : starts counting the images of a new frame."""
+
+    def __init__(self):
+        self.sprites: List[Tuple[T_SURFACE, T_COORDINATE]] = []
+
+        self.frame_sprites: int = 0
+        self.last_frame_sprites: int = 0
+
+    def add(self, surface: T_SURFACE, coords: T_COORDINATE):
+        self.sprites.append((surface, coords))
+
+    def flush(self, dest: T_SURFACE):
+        """Draws the images added, in the order they were added, on dest and empties the queue."""
+        if not self.sprites:
+            return
+
+        if hasattr(dest, "fblits"):
+            dest.fblits(self.sprites)
+        else:
+            dest.blits(self.sprites, doreturn=False)
+
+        self.frame_sprites += len(self.sprites)
+        self.sprites = []
+
+    def end_frame(self):
+        self.last_frame_sprites = self.frame_sprites
+        self.frame_sprites = 0
+
+
+class obj_AnimationClock:
+    """The animation clock is the time every animation is played on.
+
+    The time only moves forward once per frame (with tick), so everything
+    drawn in a frame sees the same time.  The image an animation shows is
+    computed from that time, the length of the animation, its speed and its
+    phase.  Animations that share those (a phase group) show the same
+    image, so it is only computed once per frame for the whole group.
+
+    # Properties
+    obj_AnimationClock.now : The time of the current frame in milliseconds.
+
+    # Methods
+    obj_AnimationClock.tick : moves the time to the start of a new frame.
+
+    obj_AnimationClock.frame_index : returns the image an animation shows in the current frame.
+
+    obj_AnimationClock.next_change_in : returns how long until an animation used this frame changes image."""
+
+    def __init__(self):
+        self.now: int = pygame.time.get_ticks()
+
+        # (length, speed, phase) -> (image index, milliseconds until the next image) for the current frame
+        self.groups: Dict[Tuple[int, float, float], Tuple[int, int]] = {}
+
+    def tick(self):
+        self.now = pygame.time.get_ticks()
+        self.groups.clear()
+
+    def frame_index(self, length: int, speed: float, phase: float = 0.0) -> int:
+        """Returns which image an animation shows in the current frame.
+
+        # Arguments
+        length : The number of images in the animation.
+
+        speed : The time in seconds to loop through the whole animation.
+
+        phase : The time in seconds the animation is ahead of the clock."""
+        group = (length, speed, phase)
+        frame = self.groups.get(group)
+        if frame is None:
+            image_duration = max(int(speed * 1000 / length), 1)
+            elapsed = self.now + int(phase * 1000)
+            frame = ((elapsed // image_duration) % length, image_duration - elapsed % image_duration)
+            self.groups[group] = frame
+
+        return frame[0]
+
+    def next_change_in(self) -> float:
+        """Returns the time in seconds until one of the animations used in the current frame shows its
+        next image, or None if no animation was used."""
+        if not self.groups:
+            return None
+
+        return min(change_in for _, change_in in self.groups.values()) / 1000
+
+
+class obj_FrameScheduler:
+    """Decides when the main loop has to redraw the game, and waits for
+    input in between instead of redrawing GAME_FPS times a second.
+
+    Anything that will need a redraw later (like an animation showing
+    its next image) asks for it with request_redraw.  The loop then
+    sleeps in pygame.event.wait until there is input or until the
+    earliest requested redraw.
+
+    # Arguments
+    policy : "event" to wait for input or a requested redraw, "poll" to
+    redraw every frame.
+
+    # Methods
+    obj_FrameScheduler.request_redraw : asks for a redraw in some time.
+
+    obj_FrameScheduler.wait_events : waits until there are events or a redraw is due and returns the events.
+
+    obj_FrameScheduler.should_redraw : returns TRUE if the game has to be redrawn.
+
+    obj_FrameScheduler.drawn : tells the scheduler the game was just redrawn."""
+
+    def __init__(self, policy: str = IDLE_POLICY):
+        if policy not in ("event", "poll"):
+            raise ValueError(f"Unknown idle policy: {policy}")
+
+        self.policy = policy
+
+        # pygame.time.get_ticks() at which the game has to be redrawn, None if nothing is waiting
+        self.deadline: int = pygame.time.get_ticks()
+
+    def request_redraw(self, delay: float = 0.0):
+        """Asks for the game to be redrawn in delay seconds at the latest."""
+        deadline = pygame.time.get_ticks() + int(delay * 1000)
+        if self.deadline is None or deadline < self.deadline:
+            self.deadline = deadline
+
+    def wait_events(self) -> List[pygame.event.Event]:
+        """Returns the events waiting. With the "event" policy, if there are none, first waits until
+        there is one or until the next requested redraw."""
+        events_list = pygame.event.get()
+        if self.policy == "poll" or events_list:
+            return events_list
+
+        if self.deadline is None:
+            event = pygame.event.wait()
+        else:
+            timeout = self.deadline - pygame.time.get_ticks()
+            if timeout <= 0:
+                return []
+            event = pygame.event.wait(timeout)
+
+        if event.type == pygame.NOEVENT:
+            return []
+
+        return [event] + pygame.event.get()
+
+    def should_redraw(self, events_list: List[pygame.event.Event], player_action: str) -> bool:
+        """Returns TRUE if the game has to be redrawn after these events and the action of the player."""
+        if self.policy == "poll" or events_list or player_action != "no-action":
+            return True
+
+        return self.deadline is not None and pygame.time.get_ticks() >= self.deadline
+
+    def drawn(self):
+        self.deadline = None
+
+
+class obj_FrozenFrame:
+    """Keeps a copy of the game frame for a menu drawn on top of it, so
+    the game does not have to be drawn again while the menu is open.
+
+    The menu sleeps in wait_events until there is input, and only draws
+    itself again when what it shows (its state) changed.
+
+    # Arguments
+    cursor : The cursor shown while the menu is open.
+
+    # Methods
+    obj_FrozenFrame.capture : draws the game and keeps a copy of the frame.
+
+    obj_FrozenFrame.restore : copies the kept frame back on SURFACE_MAIN.
+
+    obj_FrozenFrame.wait_events : waits until there are events and returns them.
+
+    obj_FrozenFrame.changed : returns TRUE if the menu has to be drawn again."""
+
+    def __init__(self, cursor: T_SURFACE = None):
+        self.cursor = cursor
+
+        self.surface: T_SURFACE = None
+        self.capture()
+
+        # What the menu showed the last time it was drawn, and whether it has to be drawn anyway
+        self.state = None
+        self.redraw: bool = True
+
+    def capture(self):
+        """Draws the game (without updating the display) and keeps a copy of it."""
+        draw_game(update_display=False)
+        self.surface = SURFACE_MAIN.copy()
+
+    def restore(self):
+        """Copies the kept frame back on SURFACE_MAIN. Nothing is marked as changed on the display,
+        whatever is drawn over it has to report itself to DIRTY_RECTS."""
+        SURFACE_MAIN.blit(self.surface, (0, 0))
+
+    def wait_events(self) -> List[pygame.event.Event]:
+        """Returns the events waiting. If there are none, and the menu does not need to be drawn,
+        waits until there is one."""
+        events_list = pygame.event.get()
+        if not events_list and not self.redraw:
+            events_list = [pygame.event.wait()] + pygame.event.get()
+
+        for event in events_list:
+            if event.type in [pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED]:
+                DIRTY_RECTS.mark_all()
+                self.redraw = True
+            elif event.type == pygame.MOUSEMOTION and USE_CURSOR and self.cursor is not None:
+                # The cursor is drawn on the display, it has to be drawn again to follow the mouse
+                self.redraw = True
+
+        return events_list
+
+    def changed(self, state) -> bool:
+        """Returns TRUE if the menu has to be drawn again, because state (anything that can be compared,
+        describing what the menu shows) is not the same as last time or the window was uncovered."""
+        changed = self.redraw or state != self.state
+        self.state = state
+        self.redraw = False
+
+        return changed
+
+
+class obj_WindowedRenderer:
+    """The renderer decides where the frames drawn on SURFACE_MAIN end up.
+    This one shows them in a window.
+
+    # Properties
+    obj_WindowedRenderer.draws : FALSE if the game should not be drawn at all.
+
+    # Methods
+    obj_WindowedRenderer.prepare : sets up SDL, before pygame is initialized.
+
+    obj_WindowedRenderer.open : creates the display surface.
+
+    obj_WindowedRenderer.present : shows the parts of the display surface that changed.
+
+    obj_WindowedRenderer.close : undoes what prepare did to SDL, before pygame is closed."""
+
+    draws: bool = True
+
+    def prepare(self):
+        # An offscreen renderer used earlier in this process may have left SDL's dummy video driver
+        obj_OffscreenRenderer.restore_video_driver()
+
+    def open(self, size: Tuple[int, int]) -> T_SURFACE:
+        return pygame.display.set_mode(size)
+
+    def present(self, rects: List[pygame.Rect] = None):
+        """Shows the given rectangles of the display surface, or all of it if rects is None."""
+        if rects is None:
+            pygame.display.flip()
+        elif rects:
+            pygame.display.update(rects)
+
+    def close(self):
+        pass
+
+
+class obj_OffscreenRenderer(obj_WindowedRenderer):
+    """Draws the frames in memory, without opening a window, using SDL's
+    dummy video driver.  The display surface holds the last frame.
+
+    The SDL_VIDEODRIVER environment variable is only changed if it does
+    not already choose the dummy driver, and its previous value is put
+    back by close (or by the next windowed renderer prepared)."""
+
+    # TRUE while SDL_VIDEODRIVER was set by an offscreen renderer, and the value it had before
+    _replaced_video_driver: bool = False
+    _previous_video_driver: str = None
+
+    def prepare(self):
+        if os.environ.get("SDL_VIDEODRIVER") == "dummy":
+            return
+
+        if pygame.display.get_init():
+            # The video driver is only chosen when the display is initialized
+            pygame.display.quit()
+
+        obj_OffscreenRenderer._previous_video_driver = os.environ.get("SDL_VIDEODRIVER")
+        obj_OffscreenRenderer._replaced_video_driver = True
+        os.environ["SDL_VIDEODRIVER"] = "dummy"
+
+    def present(self, rects: List[pygame.Rect] = None):
+        pass
+
+    def close(self):
+        self.restore_video_driver()
+
+    @staticmethod
+    def restore_video_driver():
+        """Puts back the value SDL_VIDEODRIVER had before an offscreen renderer chose the dummy driver."""
+        if not obj_OffscreenRenderer._replaced_video_driver:
+            return
+
+        if pygame.display.get_init():
+            pygame.display.quit()
+
+        if obj_OffscreenRenderer._previous_video_driver is None:
+            os.environ.pop("SDL_VIDEODRIVER", None)
+        else:
+            os.environ["SDL_VIDEODRIVER"] = obj_OffscreenRenderer._previous_video_driver
+
+        obj_OffscreenRenderer._previous_video_driver = None
+        obj_OffscreenRenderer._replaced_video_driver = False
+
+
+class obj_NullRenderer(obj_OffscreenRenderer):
+    """Does not draw anything, only the game itself runs.  A display still
+    exists (with SDL's dummy video driver) so the assets can be loaded."""
+
+    draws: bool = False
+
+
+RENDERERS: Dict[str, Callable[[], obj_WindowedRenderer]] = {
+    "windowed": obj_WindowedRenderer,
+    "offscreen": obj_OffscreenRenderer,
+    "null": obj_NullRenderer,
+}
+
+
+class obj_LightMap:
+    """The light map holds how much light reaches every tile seen by the
+    camera, from every actor with a light component, and draws the terrain
+    layer lit by it.
+
+    Each light only reaches the tiles in its own field of view.  The light
+    of all the sources is added up with numpy, then the terrain layer is
+    multiplied by it (with BLEND_MULT) in one pass.  Both are only done
+    again when a light, the terrain or the camera changes.  Tiles that are
+    not visible are left as they are, they are already drawn darkened.
+
+    # Arguments
+    ambient : The light level of the visible tiles no light reaches, from 0 to 1.
+
+    # Properties
+    obj_LightMap.light : float32 array (width, height, 3) of the light (red, green,
+    blue) reaching each tile of the camera, from 0 to 1.
+
+    obj_LightMap.surface : The lit terrain layer.
+
+    # Methods
+    obj_LightMap.update : computes the light again if something changed.
+
+    obj_LightMap.draw : returns the terrain layer lit by the light map."""
+
+    def __init__(self, ambient: float = LIGHT_AMBIENT):
+        self.ambient = ambient
+
+        self.light: np.ndarray = None
+        self.surface: T_SURFACE = None
+
+        self._key = None
+        self._lit_key = None
+
+    def update(self, incoming_map: T_MAP, camera: obj_Camera, lights: List[obj_Actor]) -> bool:
+        """Computes the light reaching the tiles seen by the camera. Returns TRUE if it changed.
 
+        # Arguments
+        incoming_map : The map the lights are on.
 
-#   ___  _     _           _
-#  / _ \| |__ (_) ___  ___| |_ ___
-# | | | | '_ \| |/ _ \/ __| __/ __|
-# | |_| | |_) | |  __/ (__| |_\__ \
-#  \___/|_.__// |\___|\___|\__|___/
-#           |__/
+        camera : The camera.
 
+        lights : The actors with a light component."""
+        x0, y0, x1, y1 = camera.rect
+        sources = tuple((actor.x, actor.y, actor.light.radius, tuple(actor.light.color), actor.light.intensity)
+                        for actor in lights
+                        if x0 - actor.light.radius <= actor.x < x1 + actor.light.radius
+                        and y0 - actor.light.radius <= actor.y < y1 + actor.light.radius)
 
-class obj_Actor:
-    """The actor object represents every entity in the game that
-    'interacts' with the player or the environment in some way.  It
-    is made up of components which alter an actors behavior.
+        key = (id(incoming_map), incoming_map.version, camera.rect, sources)
+        if key == self._key:
+            return False
+        self._key = key
 
-    # Arguments
-    x : starting x position on the current map
+        # The region the lights can reach, around the camera. A light can be up to its radius outside
+        # the camera, and its square reaches another radius further
+        margin = 2 * max((radius for _, _, radius, _, _ in sources), default=0)
+        region_x0, region_y0 = x0 - margin, y0 - margin
+        transparent = ~incoming_map.get_region(region_x0, region_y0, x1 + margin, y1 + margin)[0]
 
-    y : starting y position on the current map
+        light = np.zeros(transparent.shape + (3,), dtype=np.float32)
+        for x, y, radius, color, intensity in sources:
+            # The square of tiles within the radius of the light, always inside the region
+            local_x, local_y = x - region_x0, y - region_y0
+            window = (slice(local_x - radius, local_x + radius + 1), slice(local_y - radius, local_y + radius + 1))
 
-    name_object : string containing the name of the object, "chair" or
-    "goblin" for example.
+            in_fov = libtcod.map.compute_fov(transparent[window], (radius, radius), radius, True, FOV_ALGO)
+            reached = intensity * helper_light_falloff(radius) * in_fov
 
-    animation : a list of images that make up the object's
-   spritesheet. Created within the struc_Assets class.
+            light[window] += reached[:, :, None] * (np.array(color, dtype=np.float32) / 255)
 
-    obj_Actor.animation_speed : time in seconds it takes to loop through
-    the object animation.
+        self.light = light[margin:margin + (x1 - x0), margin:margin + (y1 - y0)]
 
-    # Properties
-    obj_Actor.flicker_speed : derived property, represents the
-    conversion of animation length in seconds to number of frames
+        return True
 
-    obj_Actor.flicker_timer : the current counter until the next frame
-    of the animation should be displayed.
+    def draw(self, terrain_layer: obj_TerrainLayer, terrain_changed: bool) -> T_SURFACE:
+        """Returns the terrain layer lit by the light map, composited again only if the light or
+        the terrain changed.
 
-    obj_Actor.sprite_image : the current image of the animation that
-    is being displayed.  0 is first image, 1 is second, etc.
+        # Arguments
+        terrain_layer : The terrain layer to light, up to date with the camera.
 
-    # Components
-    obj_Actor.creature : any object that has health, and generally can fight.
+        terrain_changed : TRUE if the terrain layer was repainted since the last call."""
+        if self.surface is None or self.surface.get_size() != terrain_layer.surface.get_size():
+            self.surface = terrain_layer.surface.copy()
+        elif not terrain_changed and self._lit_key == self._key:
+            return self.surface
+        self._lit_key = self._key
 
-    obj_Actor.ai : ai is a component that is basically a function that is
-    executed every time the object is able to act.  Usually only on creatures.
+        # Light on the visible tiles, the others are kept as they are drawn
+        visible = terrain_layer.state >= obj_TerrainLayer.VISIBLE_FLOOR
+        level = np.where(visible[:, :, None], np.minimum(self.ambient + self.light, 1.0), 1.0)
 
-    obj_Actor.container : containers are objects that can hold an inventory.
-    obj_Actor.item : items are items that are able to be picked up and used.
+        light_surface = pygame.surfarray.make_surface((level * 255).astype(np.uint8))
+        light_surface = pygame.transform.scale(light_surface, self.surface.get_size())
 
-    # Methods
-    obj_Actor.draw() : this method draws the object to the screen."""
+        self.surface.blit(terrain_layer.surface, (0, 0))
+        self.surface.blit(light_surface, (0, 0), special_flags=pygame.BLEND_MULT)
 
-    def __init__(self, x: int, y: int, name_object: str, animation: List[T_SURFACE], animation_speed: float = 1.0,
-                 creature: T_CREATURE = None, ai: T_AI = None, item: T_ITEM = None, container: T_CONTAINER = None):
-        self.x: int = x
-        self.y: int = y
+        return self.surface
 
-        self.animation: List[T_SURFACE] = animation
-        self.sprite_image: int = 0
-        self.animation_speed: float = animation_speed  # in seconds (for the entire animation)
 
-        # animation flicker speed
-        self.flicker_timer: float = 0.0
+class obj_Minimap:
+    """The minimap is an image of the map with one pixel per tile.  It is an
+    8 bit surface whose palette is COLOR_MINIMAP_TILES, and the value of a
+    pixel is the state of its tile (see obj_TerrainLayer.tile_states).
 
-        self.name_object: str = name_object
+    The pixels are written straight from the block_path, explored and
+    visible arrays of the map with pygame.surfarray.  After the first
+    update, only the tiles that a field of view or a terrain change may
+    have changed (from the fov_changes and changes logs of the map) are
+    written again.
 
-        self._creature: T_CREATURE = None
-        self._item: T_ITEM = None
-        self._container: T_CONTAINER = None
-        self._ai: T_AI = None
+    A chunked map has no bounds, so only the MINIMAP_CHUNKED_TILES around
+    the point of view are kept, and the image is written again when the
+    point of view moves to another chunk.
 
-        self.creature = creature
-        self.ai = ai
-        self.item = item
-        self.container = container
+    # Properties
+    obj_Minimap.surface : the image of the map, one pixel per tile.
 
-    def draw(self):
-        """Draws the actor on the screen. If it is an animation, it loops through the entire animation over
-        self.animation_speed seconds"""
-        is_visible = libtcod.map_is_in_fov(FOV_MAP, self.x, self.y)
+    obj_Minimap.origin : the map coordinates of the top left pixel of the image.
 
-        if is_visible:
-            if len(self.animation) == 1:
-                # SURFACE_MAIN.blit(self.animation[0], (self.x * CELL_WIDTH, self.y * CELL_HEIGHT))
-                draw_surface(self.animation[0], SURFACE_MAIN, (self.x * CELL_WIDTH, self.y * CELL_HEIGHT))
-            else:
-                if CLOCK.get_fps() > 0.0:
-                    self.flicker_timer += 1 / CLOCK.get_fps()
+    obj_Minimap.version : counter increased every time the image changes.
 
-                    if self.flicker_timer >= self.animation_speed / len(self.animation):
-                        self.sprite_image = (self.sprite_image + 1) % len(self.animation)
-                        self.flicker_timer = 0.0
+    # Methods
+    obj_Minimap.update : writes the tiles that changed since the last update.
 
-                current_frame = self.animation[self.sprite_image]
-                # SURFACE_MAIN.blit(current_frame, (self.x * CELL_WIDTH, self.y * CELL_HEIGHT))
-                draw_surface(current_frame, SURFACE_MAIN, (self.x * CELL_WIDTH, self.y * CELL_HEIGHT))
+    obj_Minimap.view : returns the square of tiles around a point, scaled up, with actors drawn on it.
 
-    @property
-    def pos(self) -> T_COORDINATE:
-        return self.x, self.y
+    obj_Minimap.overview : returns the whole image scaled to fit a size, with actors drawn on it."""
 
-    @pos.setter
-    def pos(self, value: T_COORDINATE):
-        self.x = value[0]
-        self.y = value[1]
+    def __init__(self):
+        self.surface: T_SURFACE = None
+        self.origin: T_COORDINATE = (0, 0)
+        self.version: int = 0
 
-    @property
-    def creature(self) -> T_CREATURE:
-        return self._creature
+        # The map and the versions of its logs the image is up to date with
+        self._map: T_MAP = None
+        self._terrain_version: int = 0
+        self._fov_version: int = 0
 
-    @creature.setter
-    def creature(self, value: T_CREATURE):
-        if value is None:
-            if self._creature is not None:
-                self._creature.owner = None
-                self._creature = None
-        else:
-            if self._creature is None:
-                self._creature = value
-                self._creature.owner = self
-            else:
-                self._creature.owner = None
-                self._creature = value
-                self._creature.owner = self
+        # The last surface returned by view, and what it was made from
+        self._view: T_SURFACE = None
+        self._view_key = None
 
-    @property
-    def item(self) -> T_ITEM:
-        return self._item
+    def update(self, incoming_map: T_MAP, pov: T_COORDINATE) -> bool:
+        """Writes the tiles that changed since the last update. Returns TRUE if the image changed.
 
-    @item.setter
-    def item(self, value: T_ITEM):
-        if value is None:
-            if self._item is not None:
-                self._item.owner = None
-                self._item = None
+        # Arguments
+        incoming_map : The map to draw.
+
+        pov : The coordinates the player sees from, used to choose the area kept of a chunked map."""
+        origin, size = self._area(incoming_map, pov)
+
+        if (incoming_map is not self._map or origin != self.origin or self.surface.get_size() != size
+                or incoming_map.version - self._terrain_version > len(incoming_map.changes)
+                or incoming_map.fov_version - self._fov_version > len(incoming_map.fov_changes)):
+            # Another map, another area, or more changes than the logs remember: write every tile
+            self._map = incoming_map
+            self.origin = origin
+            self.surface = pygame.Surface(size, depth=8)
+            self.surface.set_palette(COLOR_MINIMAP_TILES)
+            rects = [(origin[0], origin[1], origin[0] + size[0], origin[1] + size[1])]
         else:
-            if self._item is None:
-                self._item = value
-                self._item.owner = self
-            else:
-                self._item.owner = None
-                self._item = value
-                self._item.owner = self
+            rects = [rect for fov_version, fov_rects in incoming_map.fov_changes
+                     if fov_version > self._fov_version for rect in fov_rects]
+            rects.extend((x, y, x + 1, y + 1) for version, (x, y) in incoming_map.changes
+                         if version > self._terrain_version)
+
+        self._terrain_version = incoming_map.version
+        self._fov_version = incoming_map.fov_version
+
+        origin_x, origin_y = origin
+        pixels = pygame.surfarray.pixels2d(self.surface)
+        written = False
+        for x0, y0, x1, y1 in rects:
+            # Only the part of the rectangle inside the image
+            x0, y0 = max(x0, origin_x), max(y0, origin_y)
+            x1, y1 = min(x1, origin_x + size[0]), min(y1, origin_y + size[1])
+            if x0 >= x1 or y0 >= y1:
+                continue
 
-    @property
-    def container(self) -> T_CONTAINER:
-        return self._container
+            pixels[x0 - origin_x:x1 - origin_x, y0 - origin_y:y1 - origin_y] = \
+                obj_TerrainLayer.tile_states(*incoming_map.get_region(x0, y0, x1, y1))
+            written = True
 
-    @container.setter
-    def container(self, value: T_CONTAINER):
-        if value is None:
-            if self._container is not None:
-                self._container.owner = None
-                self._container = None
-        else:
-            if self._container is None:
-                self._container = value
-                self._container.owner = self
-            else:
-                self._container.owner = None
-                self._container = value
-                self._container.owner = self
+        # The surface stays locked as long as the pixel array exists
+        del pixels
 
-    @property
-    def ai(self) -> T_AI:
-        return self._ai
+        if written:
+            self.version += 1
 
-    @ai.setter
-    def ai(self, value: T_AI):
-        if value is None:
-            if self._ai is not None:
-                self._ai.owner = None
-                self._ai = None
-        else:
-            if self._ai is None:
-                self._ai = value
-                self._ai.owner = self
-            else:
-                self._ai.owner = None
-                self._ai = value
-                self._ai.owner = self
+        return written
 
-    def distance_to(self, other: T_ACTOR) -> float:
-        dx = other.x - self.x
-        dy = other.y - self.y
-        return ((dx ** 2) + (dy ** 2)) ** 0.5
+    def view(self, center: T_COORDINATE, tiles: int, tile_size: int,
+             actors: List[Tuple[int, int, T_COLOR]]) -> T_SURFACE:
+        """Returns the square of tiles around center, scaled up. The surface is only made again if
+        the image, the square or the actors changed.
 
-    def __del__(self):
-        self.creature = None
-        self.item = None
-        self.container = None
-        self.ai = None
+        # Arguments
+        center : The map coordinates at the center of the square.
 
+        tiles : The width and height of the square in tiles.
 
-class obj_Game:
-    """The obj_Game is an object that stores all the information used by
-    the game to 'keep track' of progress.  It will track maps, object lists,
-    and game history or record of messages.
+        tile_size : The width and height in pixels of a tile on the returned surface.
 
-    # Properties
-    obj_Game.current_map : whatever map is currently loaded.
+        actors : The (x, y, color) of the actors to draw on it, one tile of their color each."""
+        key = (self.version, center, tiles, tile_size, tuple(actors))
+        if key == self._view_key:
+            return self._view
+        self._view_key = key
 
-    obj_Game.current_objects : list of objects for the current map.
+        x0, y0 = center[0] - tiles // 2, center[1] - tiles // 2
+        area = pygame.Rect(x0 - self.origin[0], y0 - self.origin[1], tiles, tiles)
 
-    obj_Game.message_history : list of messages that have been pushed
-    to the player over the course of a game."""
+        view = pygame.Surface((tiles, tiles))
+        view.fill(COLOR_MINIMAP_TILES[obj_TerrainLayer.UNEXPLORED])
+        view.blit(self.surface, (0, 0), area=area)
+        for x, y, color in actors:
+            view.fill(color, (x - x0, y - y0, 1, 1))
 
-    def __init__(self):
-        self.current_map = map_create()
-        self.current_objects: List[obj_Actor] = []
+        self._view = pygame.transform.scale(view, (tiles * tile_size, tiles * tile_size))
 
-        self.message_history: List[T_MESSAGE] = []
+        return self._view
 
+    def overview(self, size: Tuple[int, int], actors: List[Tuple[int, int, T_COLOR]]) -> T_SURFACE:
+        """Returns the whole image scaled to fit in size, keeping its proportions.
 
-class obj_Spritesheet:
-    """Class used to grab images out of a sprite sheet.  As a class,
-    it allows you to access and subdivide portions of the
-    sprite_sheet.
+        # Arguments
+        size : The (width, height) in pixels the image has to fit in.
 
-    # Arguments
-    file_name : String which contains the directory/filename of the
-    image for use as a spritesheet.
+        actors : The (x, y, color) of the actors to draw on it, at least one pixel of their color each."""
+        width, height = self.surface.get_size()
+        scale = min(size[0] / width, size[1] / height)
 
-    width : Integer that specifies how wide each sprite in the
-    spritesheet is in pixels.
+        # The palette is replaced by the colors, the actors are drawn in colors that are not in it
+        colors = pygame.Surface((width, height))
+        colors.blit(self.surface, (0, 0))
 
-    height : Integer that specifies how high each sprite in the
-    spritesheet is in pixels.
+        scaled_size = (max(int(width * scale), 1), max(int(height * scale), 1))
+        if scale < 1:
+            # Averages the tiles that end up on the same pixel instead of dropping some of them
+            overview = pygame.transform.smoothscale(colors, scaled_size)
+        else:
+            overview = pygame.transform.scale(colors, scaled_size)
 
-    # Properties
-    obj_Spritesheet.sprite_sheet : The loaded spritesheet accessed
-    through the file_name argument.
+        dot_size = max(int(scale), 1)
+        for x, y, color in actors:
+            overview.fill(color, (int((x - self.origin[0]) * scale), int((y - self.origin[1]) * scale),
+                                  dot_size, dot_size))
 
-    # Methods
-    obj_Spritesheet.get_image : returns a list containing a single
-    image from a spritesheet given a grid location.
+        return overview
 
-    obj_Spritesheet.get_animation : returns a list containing a
-    sequence of images starting from a grid location."""
+    def _area(self, incoming_map: T_MAP, pov: T_COORDINATE) -> Tuple[T_COORDINATE, Tuple[int, int]]:
+        """Returns the map coordinates of the top left tile and the size of the area kept."""
+        if isinstance(incoming_map, obj_ChunkedMap):
+            chunk_size = incoming_map.chunk_size
+            chunks = max(MINIMAP_CHUNKED_TILES // chunk_size, 1)
+            origin = ((pov[0] // chunk_size - chunks // 2) * chunk_size, (pov[1] // chunk_size - chunks // 2) * chunk_size)
+            return origin, (chunks * chunk_size, chunks * chunk_size)
 
-    def __init__(self, file_name: str, width: int, height: int):
-        # Load the spritesheet
-        self.sprite_sheet = pygame.image.load(file_name).convert()
+        return (0, 0), (incoming_map.width, incoming_map.height)
 
-        self.width = width
-        self.height = height
 
-    def get_sprite(self, column: int, row: int, scale: Tuple[int, int] = None, width: int = None,
-                   height: int = None) -> T_SURFACE:
-        """This method returns a single image obtained from the spritesheet.
+class obj_DirtyRects:
+    """Keeps track of the parts of the screen that changed since the last
+    time the display was updated, so only those are sent to the display.
 
-        # Arguments
-        column : Column of the image.
+    Things drawn every frame (actors, text, overlays) are reported with a
+    key and what was drawn.  A rectangle is only marked as changed when
+    what is drawn under a key changes, moves, appears or disappears.
+    Things that know when they changed (like the terrain layer) mark
+    their rectangles directly.
 
-        row : Row of the image.
+    # Arguments
+    screen_rect : The rectangle of the whole screen.
 
-        scale = None : Tuple (width, height).  If included, scales the
-        images to a new size in pixels
+    # Methods
+    obj_DirtyRects.mark : marks a rectangle as changed.
 
-        width : Integer that specifies how wide each sprite in the
-        spritesheet is in pixels. Defaults to the width given in the constructor.
+    obj_DirtyRects.mark_all : marks the whole screen as changed.
 
-        height : Integer that specifies how high each sprite in the
-        spritesheet is in pixels. Defaults to the height given in the constructor."""
-        if width is None:
-            width = self.width
+    obj_DirtyRects.report : reports something drawn this frame.
 
-        if height is None:
-            height = self.height
+    obj_DirtyRects.collect : returns the changed rectangles and starts a new frame."""
 
-        # Create a blank image
-        image: T_SURFACE = pygame.Surface((width, height)).convert(PYGAME_DISPLAY)
+    def __init__(self, screen_rect: pygame.Rect):
+        self.screen_rect = pygame.Rect(screen_rect)
 
-        # Copy from spritesheet onto the spritesheet
-        image_area = (column * width, row * height, width, height)
-        draw_surface(self.sprite_sheet, image, (0, 0), area=image_area)
+        self.rects: List[pygame.Rect] = []
+        self.all_dirty: bool = True
 
-        # Set transparency to black
-        image.set_colorkey(COLOR_BLACK)
+        # key -> (rect, content) of what was drawn in the current and in the previous frame
+        self.current: Dict = {}
+        self.previous: Dict = {}
 
-        # Scale the image to the desired size
-        if scale:
-            new_w, new_h = scale
-            image = pygame.transform.scale(image, (new_w, new_h)).convert()
+    def mark(self, rect: T_RECT):
+        self.rects.append(pygame.Rect(rect))
 
-        return image
+    def mark_all(self):
+        self.all_dirty = True
 
-    def get_image(self, column: int, row: int, scale: Tuple[int, int] = None, width: int = None,
-                  height: int = None) -> List[T_SURFACE]:
-        """This method returns a single image within a list
-        created from the spritesheet.
+    def report(self, key, rect: T_RECT, content=None, always: bool = False):
+        """Reports something drawn this frame.
 
         # Arguments
-        column : Column of the image.
+        key : Anything hashable that identifies what was drawn (an actor, "debug", ...).
+
+        rect : Where it was drawn.
+
+        content : What was drawn (a surface, a string...). If it is the same as the last
+        frame, at the same place, the rectangle is not marked as changed.
+
+        always : If True, the rectangle is marked as changed every frame."""
+        self.current[key] = (pygame.Rect(rect), content)
+        if always:
+            self.mark(rect)
+
+    def collect(self) -> List[pygame.Rect]:
+        """Returns the rectangles that changed since the last call, clipped to the screen."""
+        for key, drawn in self.current.items():
+            previous_drawn = self.previous.pop(key, None)
+            if previous_drawn != drawn:
+                self.rects.append(drawn[0])
+                if previous_drawn is not None:
+                    self.rects.append(previous_drawn[0])
+
+        # Whatever was drawn last frame but not in this one has to be erased
+        for previous_rect, _ in self.previous.values():
+            self.rects.append(previous_rect)
+
+        self.previous = self.current
+        self.current = {}
+
+        if self.all_dirty:
+            rects = [self.screen_rect.copy()]
+        elif len(self.rects) > DIRTY_RECTS_MAX:
+            rects = [self.rects[0].unionall(self.rects[1:]).clip(self.screen_rect)]
+        else:
+            rects = [rect.clip(self.screen_rect) for rect in self.rects]
+            rects = [rect for rect in rects if rect.width > 0 and rect.height > 0]
 
-        row : Row of the image.
+        self.rects = []
+        self.all_dirty = False
 
-        scale = None : Tuple (width, height).  If included, scales the
-        images to a new size in pixels
+        return rects
 
-        width : Integer that specifies how wide each sprite in the
-        spritesheet is in pixels. Defaults to the width given in the constructor.
 
-        height : Integer that specifies how high each sprite in the
-        spritesheet is in pixels. Defaults to the height given in the constructor."""
-        return [self.get_sprite(column, row, scale, width, height)]
+class obj_TextCache:
+    """Remembers rendered texts so the same text is not rendered again every
+    frame.  Texts are keyed by (text, text color, background color, font),
+    and the least recently used ones are forgotten when there are more than
+    max_texts of them.
 
-    def get_animation(self, coords: List[T_COORDINATE], scale: Tuple[int, int] = None,
-                      width: int = None, height: int = None) -> List[T_SURFACE]:
-        """This method returns a sequence of images within a list
-        created from the spritesheet.
+    The surfaces returned are shared, they must not be drawn on.
 
-        # Arguments
-        coords : List [Tuple (column, row)]. A list of tuples that specify the coordinates
-        of the images to be taken
+    # Arguments
+    max_texts : The maximum number of rendered texts kept in the cache.
+
+    # Properties
+    obj_TextCache.texts : OrderedDict mapping the keys to the rendered
+    surfaces, from least to most recently used.
 
-        scale = None : Tuple (width, height).  If included, scales the
-        images to a new size in pixels
+    obj_TextCache.hits / misses : how many texts were found in the cache or
+    had to be rendered.
 
-        width : Integer that specifies how wide each sprite in the
-        spritesheet is in pixels. Defaults to the width given in the constructor.
+    # Methods
+    obj_TextCache.render : returns the rendered text.
 
-        height : Integer that specifies how high each sprite in the
-        spritesheet is in pixels. Defaults to the height given in the constructor."""
-        image_list = []
+    obj_TextCache.clear : forgets all the rendered texts."""
 
-        if width is None:
-            width = self.width
+    def __init__(self, max_texts: int = TEXT_CACHE_SIZE):
+        self.max_texts = max_texts
 
-        if height is None:
-            height = self.height
+        self.texts: OrderedDict[Tuple[str, T_COLOR, T_COLOR, T_FONT], T_SURFACE] = OrderedDict()
 
-        for column, row in coords:
-            # Create a blank image
-            image: T_SURFACE = pygame.Surface((width, height)).convert(PYGAME_DISPLAY)
+        self.hits: int = 0
+        self.misses: int = 0
 
-            # Copy from the spritesheet onto the image
-            image_area = (column * width, row * height, width, height)
-            draw_surface(self.sprite_sheet, image, (0, 0), area=image_area)
+    def render(self, text: str, text_color: T_COLOR, back_color: T_COLOR, font: T_FONT) -> T_SURFACE:
+        key = (text, tuple(text_color), None if back_color is None else tuple(back_color), font)
 
-            # Set transparency to blank
-            image.set_colorkey(COLOR_BLACK)
+        text_surface = self.texts.get(key)
+        if text_surface is not None:
+            self.hits += 1
+            self.texts.move_to_end(key)
+            return text_surface
 
-            # Scale the image to the desired size
-            if scale:
-                new_w, new_h = scale
-                image = pygame.transform.scale(image, (new_w, new_h)).convert()
+        self.misses += 1
+        text_surface = font.render(text, False, text_color, back_color)
 
-            image_list.append(image)
+        self.texts[key] = text_surface
+        if len(self.texts) > self.max_texts:
+            self.texts.popitem(last=False)
 
-        return image_list
+        return text_surface
 
+    def clear(self):
+        self.texts.clear()
 
-class obj_Spritesheet_Set:
-    """Class used to grab images out of multiple spritesheets.  As a class,
-    it allows you to access and subdivide portions of the
-    sprite_sheet.
 
-    # Arguments
-    file_names : List of strings which contains the directory/filename of the
-    images for use as the spritesheets.
+class obj_MessagePanel:
+    """The message panel shows the last messages of a message history on
+    its own transparent surface.  The surface is only composited again when
+    messages are added or the panel is scrolled, otherwise drawing the panel
+    is a single blit.
 
-    width : Integer that specifies how wide each sprite in the
-    spritesheets are in pixels.
+    # Arguments
+    font : The font of the messages.
 
-    height : Integer that specifies how high each sprite in the
-    spritesheets are in pixels.
+    num_lines : The number of messages shown at once.
 
     # Properties
-    obj_Spritesheet.sprite_sheets : The list of loaded spritesheet accessed
-    through the file_names argument.
-
-    # Methods
-    obj_Spritesheet.get_image : returns a list containing a single
-    image from a spritesheet given a grid location.
+    obj_MessagePanel.surface : The composited panel.
 
-    obj_Spritesheet.get_animation : returns a list containing a
-    sequence of images starting from a grid location."""
+    obj_MessagePanel.scroll : How many messages back from the newest one
+    the panel is scrolled.
 
-    def __init__(self, file_names: List[str], width: int, height: int):
-        self.sprite_sheets: List[obj_Spritesheet] = [obj_Spritesheet(file_name, width, height) for file_name in
-                                                     file_names]
+    obj_MessagePanel.version : Increased every time the panel is composited.
 
-        self.width = width
-        self.height = height
+    # Methods
+    obj_MessagePanel.update : composites the panel again if the messages changed.
+
+    obj_MessagePanel.scroll_by : scrolls the panel towards older or newer messages."""
+
+    def __init__(self, font: T_FONT, num_lines: int = NUM_MESSAGES):
+        self.font = font
+        self.num_lines = num_lines
+        self.line_height = helper_text_height(font)
+
+        self.surface: T_SURFACE = pygame.Surface((GAME_WIDTH, num_lines * self.line_height), pygame.SRCALPHA)
+        self.scroll: int = 0
+        self.version: int = 0
+
+        # The history and its length when the panel was last composited
+        self._history: List[T_MESSAGE] = None
+        self._history_length: int = 0
+        self._needs_update: bool = True
+
+    def update(self, message_history: List[T_MESSAGE]):
+        """Composites the panel again if messages were added to the history since the last time."""
+        if message_history is not self._history:
+            self._history = message_history
+            self._history_length = 0
+            self.scroll = 0
+            self._needs_update = True
+
+        new_messages = len(message_history) - self._history_length
+        if new_messages:
+            if self.scroll:
+                # Keep showing the same messages while the player reads back
+                self.scroll += new_messages
+            self._history_length = len(message_history)
+            self._needs_update = True
+
+        if not self._needs_update:
+            return
+
+        end = len(message_history) - self.scroll
+        to_draw = message_history[max(end - self.num_lines, 0):end]
+
+        # The newest message is at the bottom of the panel
+        self.surface.fill((0, 0, 0, 0))
+        start_y = self.surface.get_height() - len(to_draw) * self.line_height
+        for i, (msg, msg_color, bg_color) in enumerate(to_draw):
+            draw_text(self.surface, msg, (0, start_y + i * self.line_height), msg_color, bg_color, self.font)
+
+        self.version += 1
+        self._needs_update = False
+
+    def scroll_by(self, lines: int):
+        """Scrolls the panel by the given number of lines, towards older messages if it is positive."""
+        max_scroll = max(len(self._history or []) - self.num_lines, 0)
+        scroll = min(max(self.scroll + lines, 0), max_scroll)
+        if scroll != self.scroll:
+            self.scroll = scroll
+            self._needs_update = True
+
+
+class obj_Atlas:
+    """A texture atlas packs sprites taken from spritesheets into a few
+    large surfaces (pages), already scaled and converted to the display
+    format, with black as the transparent color.
+
+    Sprites are added first, which gives them an integer id, then the
+    atlas is built.  Building loads every spritesheet once, and the
+    spritesheets are not kept once the sprites are packed.
+
+    The packed pages are saved as raw pixels in cache_dir, in a file named
+    after a hash of the spritesheets and of every sprite added.  The next
+    build with the same sprites reads that file instead of decoding and
+    scaling the spritesheets again.  When a spritesheet or a sprite
+    changes, the hash changes and the pages are built again, and the
+    files of the previous pages are deleted.
 
-    def get_sprite(self, sprite_sheet: int, column: int, row: int, scale: Tuple[int, int] = None,
-                   width: int = None, height: int = None) -> T_SURFACE:
-        """This method returns a single image obtained from the spritesheet.
+    # Arguments
+    page_size : Tuple (width, height), the maximum size of a page in pixels.
 
-        # Arguments
-        column : Column of the image.
+    cache_dir : The directory the packed pages are saved in. None to not save them.
 
-        row : Row of the image.
+    # Properties
+    obj_Atlas.pages : The list of packed surfaces, empty until the atlas is built.
 
-        scale = None : Tuple (width, height).  If included, scales the
-        images to a new size in pixels
+    obj_Atlas.areas : For each sprite id, the (page, rectangle) it is packed in.
 
-        width : Integer that specifies how wide each sprite in the
-        spritesheet is in pixels. Defaults to the width given in the constructor.
+    obj_Atlas.from_cache : TRUE if the pages were read from the cache when the atlas was built.
 
-        height : Integer that specifies how high each sprite in the
-        spritesheet is in pixels. Defaults to the height given in the constructor."""
-        return self.sprite_sheets[sprite_sheet].get_sprite(column, row, scale, width, height)
+    # Methods
+    obj_Atlas.add : adds a sprite from a spritesheet and returns its id.
 
-    def get_image(self, sprite_sheet: int, column: int, row: int, scale: Tuple[int, int] = None,
-                  width: int = None, height: int = None) -> List[T_SURFACE]:
-        """This method returns a single image within a list
-        created from the spritesheet.
+    obj_Atlas.build : packs all the sprites added.
 
-        # Arguments
-        sprite_sheet : Which spritesheet to use.
+    obj_Atlas.sprite : returns the sprite with the given id.
 
-        column : Column of the image.
+    obj_Atlas.area : returns the page and the rectangle of the sprite with the given id."""
 
-        row : Row of the image.
+    # Increase when the way the pages are drawn or saved changes, to ignore the old cache files
+    CACHE_VERSION = 1
 
-        scale = None : Tuple (width, height).  If included, scales the
-        images to a new size in pixels
+    def __init__(self, page_size: Tuple[int, int] = ATLAS_PAGE_SIZE, cache_dir: str = ASSET_CACHE_DIR):
+        self.page_size = page_size
+        self.cache_dir = cache_dir
 
-        width : Integer that specifies how wide each sprite in the
-        spritesheet is in pixels. Defaults to the width given in the constructor.
+        self.pages: List[T_SURFACE] = []
+        self.areas: List[Tuple[int, pygame.Rect]] = []
+        self.from_cache: bool = False
 
-        height : Integer that specifies how high each sprite in the
-        spritesheet is in pixels. Defaults to the height given in the constructor."""
-        return self.sprite_sheets[sprite_sheet].get_image(column, row, scale, width, height)
+        # (file name, area on the spritesheet, scale, tint) of every sprite id
+        self._requests: List[Tuple[str, T_RECT, Tuple[int, int], T_COLOR]] = []
+        self._ids: Dict[Tuple[str, T_RECT, Tuple[int, int], T_COLOR], int] = {}
 
-    def get_animation(self, coords: List[Tuple[int, int, int]], scale: Tuple[int, int] = None,
-                      width: int = None, height: int = None) -> List[T_SURFACE]:
-        """This method returns a sequence of images within a list
-        created from the spritesheet.
+    def add(self, file_name: str, column: int, row: int, width: int, height: int,
+            scale: Tuple[int, int] = None, tint: T_COLOR = None) -> int:
+        """Adds a sprite to the atlas and returns its id. The same sprite added twice gets the same id.
 
         # Arguments
-        coords : List [Tuple (spritesheet, column, row)]. A list of tuples that specify the coordinates
-        of the images to be taken.
-
-        scale = None : Tuple (width, height).  If included, scales the
-        images to a new size in pixels
+        file_name : The directory/filename of the spritesheet.
 
-        width : Integer that specifies how wide each sprite in the
-        spritesheet is in pixels. Defaults to the width given in the constructor.
-
-        height : Integer that specifies how high each sprite in the
-        spritesheet is in pixels. Defaults to the height given in the constructor."""
-        image_list = []
+        column : Column of the image.
 
-        for sprite_sheet, column, row in coords:
-            image_list.append(self.sprite_sheets[sprite_sheet].get_sprite(column, row, scale, width, height))
+        row : Row of the image.
 
-        return image_list
+        width : How wide each sprite in the spritesheet is in pixels.
+
+        height : How high each sprite in the spritesheet is in pixels.
+
+        scale = None : Tuple (width, height). If included, the sprite is scaled to this size in pixels.
+
+        tint = None : If included, the colors of the sprite are multiplied by this color."""
+        if self.pages:
+            raise RuntimeError("Sprites can not be added to an atlas after it is built")
+
+        request = (file_name, (column * width, row * height, width, height), scale or (width, height),
+                   None if tint is None else tuple(tint))
+        if request not in self._ids:
+            self._ids[request] = len(self._requests)
+            self._requests.append(request)
+
+        return self._ids[request]
+
+    def build(self):
+        """Packs every sprite added, in shelves from the tallest to the shortest, or reads the packed
+        pages from the cache."""
+        page_sizes = self._place_sprites()
+
+        cache_file = None
+        if self.cache_dir is not None:
+            cache_file = os.path.join(self.cache_dir, self._cache_key() + ".atlas")
+
+        self.pages = self._read_cache(cache_file, page_sizes) if cache_file is not None else None
+        self.from_cache = self.pages is not None
+        if not self.from_cache:
+            self.pages = self._draw_pages(page_sizes)
+            if cache_file is not None:
+                self._write_cache(cache_file)
+
+        for page in self.pages:
+            page.set_colorkey(COLOR_BLACK)
+
+    def sprite(self, sprite_id: int) -> T_SURFACE:
+        """Returns the sprite with the given id.
+
+        The sprite shares its pixels with the atlas, it must not be drawn on."""
+        page, page_rect = self.areas[sprite_id]
+        return self.pages[page].subsurface(page_rect)
+
+    def area(self, sprite_id: int) -> Tuple[T_SURFACE, pygame.Rect]:
+        """Returns the page and the rectangle on it of the sprite with the given id, to draw it with
+        the area argument of blit."""
+        page, page_rect = self.areas[sprite_id]
+        return self.pages[page], page_rect
+
+    def _place_sprites(self) -> List[Tuple[int, int]]:
+        """Finds where every sprite goes, fills self.areas and returns the size of each page."""
+        page_width, page_height = self.page_size
+        sprite_ids = sorted(range(len(self._requests)), key=lambda sprite_id: -self._requests[sprite_id][2][1])
+
+        self.areas = [None] * len(self._requests)
+        page_sizes = [[0, 0]]
+        x = y = shelf_height = 0
+        for sprite_id in sprite_ids:
+            width, height = self._requests[sprite_id][2]
+            if x + width > page_width:
+                x, y, shelf_height = 0, y + shelf_height, 0
+            if y + height > page_height:
+                x = y = shelf_height = 0
+                page_sizes.append([0, 0])
+
+            self.areas[sprite_id] = (len(page_sizes) - 1, pygame.Rect(x, y, width, height))
+            page_sizes[-1][0] = max(page_sizes[-1][0], x + width)
+            page_sizes[-1][1] = max(page_sizes[-1][1], y + height)
+            x += width
+            shelf_height = max(shelf_height, height)
+
+        return [(width, height) for width, height in page_sizes]
+
+    def _draw_pages(self, page_sizes: List[Tuple[int, int]]) -> List[T_SURFACE]:
+        pages = []
+        for size in page_sizes:
+            page: T_SURFACE = pygame.Surface(size).convert(PYGAME_DISPLAY)
+            page.fill(COLOR_BLACK)
+            pages.append(page)
+
+        # Copy the sprites, loading each spritesheet only once
+        sprite_sheets: Dict[str, T_SURFACE] = {}
+        for (file_name, sheet_area, scale, tint), (page, page_rect) in zip(self._requests, self.areas):
+            if file_name not in sprite_sheets:
+                sprite_sheets[file_name] = pygame.image.load(file_name).convert()
+
+            image = sprite_sheets[file_name].subsurface(sheet_area)
+            if scale != image.get_size():
+                image = pygame.transform.scale(image, scale)
+            if tint is not None:
+                image = image.copy()
+                image.fill(tint, special_flags=pygame.BLEND_MULT)
+            pages[page].blit(image, page_rect)
+
+        return pages
+
+    def _cache_key(self) -> str:
+        """Returns a hash of the spritesheets, the sprites and how they are packed."""
+        key = hashlib.sha1(repr((self.CACHE_VERSION, self.page_size, self._requests)).encode())
+        for file_name in sorted({request[0] for request in self._requests}):
+            with open(file_name, "rb") as sprite_sheet_file:
+                key.update(sprite_sheet_file.read())
+
+        return key.hexdigest()
+
+    def _read_cache(self, cache_file: str, page_sizes: List[Tuple[int, int]]) -> List[T_SURFACE]:
+        """Returns the pages saved in the cache file, or None if there are none."""
+        try:
+            with open(cache_file, "rb") as atlas_file:
+                pixels = atlas_file.read()
+        except OSError:
+            return None
+
+        if len(pixels) != sum(width * height * 3 for width, height in page_sizes):
+            return None
+
+        pages = []
+        start = 0
+        for width, height in page_sizes:
+            end = start + width * height * 3
+            pages.append(pygame.image.frombytes(pixels[start:end], (width, height), "RGB").convert(PYGAME_DISPLAY))
+            start = end
+
+        return pages
+
+    def _write_cache(self, cache_file: str):
+        """Saves the pages as raw RGB pixels, and deletes the pages saved for other sprites. The cache
+        is only there to go faster, so failing to write it is not an error."""
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            temporary_file = cache_file + ".tmp"
+            with open(temporary_file, "wb") as atlas_file:
+                for page in self.pages:
+                    atlas_file.write(pygame.image.tobytes(page, "RGB"))
+            os.replace(temporary_file, cache_file)
+
+            # The pages of sprites that changed since are never read again
+            for file_name in os.listdir(self.cache_dir):
+                old_file = os.path.join(self.cache_dir, file_name)
+                if file_name.endswith((".atlas", ".atlas.tmp")) and old_file != cache_file:
+                    os.remove(old_file)
+        except OSError:
+            pass
 
 
 #   ____                                             _
@@ -612,7 +2631,7 @@ class com_Creature:
         dy : The relative y value to move the creature"""
         did_something = False
 
-        tile_is_blocked = GAME.current_map[self.owner.x + dx][self.owner.y + dy].block_path
+        tile_is_blocked = map_check_wall(self.owner.x + dx, self.owner.y + dy)
 
         target = map_get_creature(self.owner.x + dx, self.owner.y + dy, excluded_objects=[self.owner])
 
@@ -621,18 +2640,41 @@ class com_Creature:
             did_something = True
 
         if not tile_is_blocked and target is None:
-            self.owner.x += dx
-            self.owner.y += dy
+            self.owner.pos = (self.owner.x + dx, self.owner.y + dy)
             did_something = True
 
         return did_something
 
     def move_towards(self, target: T_ACTOR):
-        line = map_find_line(self.owner.pos, target.pos)
-        target_point = line[1]
+        """Moves the creature one step along the shortest path to the target.
+        Falls back to a straight line if there is no path.
+
+        # Arguments
+        target : The actor to move towards"""
+        path = map_find_path(self.owner.pos, target.pos)
+        if path:
+            target_point = path[0]
+        else:
+            line = map_find_line(self.owner.pos, target.pos)
+            target_point = line[1]
         change_position = (target_point[0] - self.owner.x, target_point[1] - self.owner.y)
         self.move(*change_position)
 
+    def move_downhill(self, field: 'obj_DistanceField') -> bool:
+        """Moves the creature one step towards the target of the distance field, going around walls
+        and other creatures. Returns FALSE if there is no step that gets closer.
+
+        # Arguments
+        field : An up to date obj_DistanceField."""
+        def is_free(x: int, y: int) -> bool:
+            return (x, y) == field.target or map_get_creature(x, y) is None
+
+        step = field.step_from(self.owner.x, self.owner.y, is_free)
+        if step is None:
+            return False
+
+        return self.move(*step)
+
     def attack(self, target: T_ACTOR, damage: int):
         """Attacks the target creature. Automatically called if the creature moves on the target
 
@@ -718,10 +2760,9 @@ class com_Item:
         else:
             new_x, new_y = new_coords
 
-        GAME.current_objects.append(self.owner)
         self.current_container.remove(self.owner)
-        self.owner.x = new_x
-        self.owner.y = new_y
+        self.owner.pos = (new_x, new_y)
+        GAME.current_objects.append(self.owner)
         game_message("You drop the item", COLOR_L_GREEN)
 
     # TODO: Use the item
@@ -801,6 +2842,28 @@ class com_Container:
 # /__/     \__\ |__|
 
 
+class com_Light:
+    """Lights light up the tiles around their owner that they can reach in a
+    straight line, less and less up to their radius.
+
+    # Arguments
+    radius : How far the light reaches, in tiles.
+
+    color : The color of the light.
+
+    intensity : How bright the light is next to its owner, 1.0 lights a tile fully.
+
+    # Properties
+    com_Light.owner : The actor that has this light component attached to it."""
+
+    def __init__(self, radius: int, color: T_COLOR = COLOR_WHITE, intensity: float = 1.0):
+        self.radius = radius
+        self.color = color
+        self.intensity = intensity
+
+        self.owner: obj_Actor = None
+
+
 class ai_Confuse:
     """Once per turn, execute"""
 
@@ -817,9 +2880,13 @@ class ai_Chase:
         self.owner: T_ACTOR = None
 
     def take_turn(self):
-        if libtcod.map_is_in_fov(FOV_MAP, self.owner.x, self.owner.y):
-            # Move towards the player if you can see him
-            self.owner.creature.move_towards(PLAYER)
+        if map_is_in_fov(self.owner.x, self.owner.y):
+            # Move towards the player if you can see him, following the distance field shared by all chasers
+            GAME.chase_field.update(GAME.current_map, PLAYER.pos)
+            if GAME.chase_field.get(self.owner.x, self.owner.y) == obj_DistanceField.UNREACHABLE:
+                self.owner.creature.move_towards(PLAYER)
+            else:
+                self.owner.creature.move_downhill(GAME.chase_field)
         else:
             # Move randomly
             self.owner.creature.move(libtcod.random_get_int(0, -1, 1), libtcod.random_get_int(0, -1, 1))
@@ -895,57 +2962,140 @@ def cast_fireball():
     radius = 1
     max_range = 4
 
-    # Get target tile
-    target_point = menu_tile_select(
-        line_config={"coords_origin": PLAYER.pos,
-                     "max_range": max_range,
-                     "penetrate_walls": False,
-                     "penetrate_creatures": False},
-        circle_config={"radius": radius})
+    # Get target tile
+    target_point = menu_tile_select(
+        line_config={"coords_origin": PLAYER.pos,
+                     "max_range": max_range,
+                     "penetrate_walls": False,
+                     "penetrate_creatures": False},
+        circle_config={"radius": radius})
+
+    if target_point is None:
+        return "Cancelled"
+
+    # Get the area of the explosion
+    area = map_find_area("square", target_point, radius)
+
+    # Damage all creatures
+    for target_to_damage in map_get_creatures_in(area):
+        target_to_damage.creature.take_damage(damage)
+        if target_to_damage is not PLAYER and target_to_damage.creature is not None:
+            game_message(f"{target_to_damage.creature.full_name} howls in pain.", COLOR_RED)
+
+    return "Success"
+
+
+# .___  ___.      ___      .______
+# |   \/   |     /   \     |   _  \
+# |  \  /  |    /  ^  \    |  |_)  |
+# |  |\/|  |   /  /_\  \   |   ___/
+# |  |  |  |  /  _____  \  |  |
+# |__|  |__| /__/     \__\ | _|
+
+
+def map_create(generator: str = MAP_GENERATOR, width: int = MAP_WIDTH, height: int = MAP_HEIGHT,
+               seed: int = None) -> T_MAP:
+    """Creates a map, an obj_Map that stores its tiles in arrays.
+    If MAP_CHUNKED is set, creates an unbounded obj_ChunkedMap instead.
+
+    # Arguments
+    generator : The name of the generator (a key of MAP_GENERATORS) that lays out the walls.
+
+    width : The width of the map in tiles.
+
+    height : The height of the map in tiles.
+
+    seed : The seed of the generator. The same seed always creates the same map.
+    If None, MAP_SEED is used, and if it is None too, a random seed."""
+    if seed is None:
+        seed = MAP_SEED
+
+    if MAP_CHUNKED:
+        if seed is None:
+            seed = int(np.random.default_rng().integers(0x7FFFFFFF))
+        new_map = obj_ChunkedMap(partial(map_generate_chunk, generator=generator), seed=seed)
+
+        # Clear the area around where the player starts
+        spawn_x, spawn_y = PLAYER_SPAWN
+        for x in range(spawn_x - SPAWN_CLEAR_RADIUS, spawn_x + SPAWN_CLEAR_RADIUS + 1):
+            for y in range(spawn_y - SPAWN_CLEAR_RADIUS, spawn_y + SPAWN_CLEAR_RADIUS + 1):
+                new_map.set_block_path(x, y, False)
+
+        return new_map
+
+    new_map = obj_Map(width, height)
+    new_map.block_path[:] = MAP_GENERATORS[generator](width, height, np.random.default_rng(seed))
+
+    map_make_fov(new_map)
+
+    return new_map
+
+
+def map_generate_chunk(chunk_x: int, chunk_y: int, chunk_size: int, seed: int,
+                       generator: str = MAP_GENERATOR) -> T_MAP:
+    """Generates a chunk of an obj_ChunkedMap, always the same for the same arguments.
+
+    The walls are laid out by the generator, then a corridor is dug through the middle row and
+    column of the chunk so that it joins its neighbours (the generators surround the chunk with walls).
+
+    # Arguments
+    chunk_x : The x coordinate of the chunk.
+
+    chunk_y : The y coordinate of the chunk.
+
+    chunk_size : The width and height of the chunk in tiles.
 
-    if target_point is None:
-        return "Cancelled"
+    seed : The seed of the map.
 
-    # Get sequence of tiles
-    tiles_to_damage = map_find_radius(target_point, radius)
+    generator : The name of the generator (a key of MAP_GENERATORS) that lays out the walls."""
+    rng = np.random.default_rng([seed, chunk_x & 0xFFFFFFFF, chunk_y & 0xFFFFFFFF])
 
-    # Damage all creatures
-    for tile_x, tile_y in tiles_to_damage:
-        target_to_damage = map_get_creature(tile_x, tile_y)
-        if target_to_damage is not None:
-            target_to_damage.creature.take_damage(damage)
-            if target_to_damage is not PLAYER and target_to_damage.creature is not None:
-                game_message(f"{target_to_damage.creature.full_name} howls in pain.", COLOR_RED)
+    chunk = obj_Map(chunk_size, chunk_size)
+    chunk.block_path[:] = MAP_GENERATORS[generator](chunk_size, chunk_size, rng)
 
-    return "Success"
+    middle = chunk_size // 2
+    chunk.block_path[middle, :] = False
+    chunk.block_path[:, middle] = False
 
+    return chunk
 
-# .___  ___.      ___      .______
-# |   \/   |     /   \     |   _  \
-# |  \  /  |    /  ^  \    |  |_)  |
-# |  |\/|  |   /  /_\  \   |   ___/
-# |  |  |  |  /  _____  \  |  |
-# |__|  |__| /__/     \__\ | _|
 
+def map_find_spawn(coords: T_COORDINATE, incoming_map: T_MAP = None) -> T_COORDINATE:
+    """Returns the coordinates if the tile is free, otherwise the closest tile that does not block movement
+    and has no creature on it.
 
-def map_create() -> T_MAP:
-    """Creates a map which is a 2D array containing 'struc_Tile's"""
-    new_map = [[struc_Tile(False) for y in range(MAP_HEIGHT)] for x in range(MAP_WIDTH)]
+    A chunked map is only searched up to chunk_size tiles away from the coordinates.
 
-    new_map[10][10].block_path = True
-    new_map[10][15].block_path = True
+    # Arguments
+    coords : The preferred coordinates.
 
-    for x in range(MAP_WIDTH):
-        new_map[x][0].block_path = True
-        new_map[x][MAP_HEIGHT - 1].block_path = True
+    incoming_map : The map to search. Defaults to the current map."""
+    if incoming_map is None:
+        incoming_map = GAME.current_map
 
-    for y in range(MAP_HEIGHT):
-        new_map[0][y].block_path = True
-        new_map[MAP_WIDTH - 1][y].block_path = True
+    def occupied(x: int, y: int) -> bool:
+        return any(obj.creature is not None for obj in GAME.current_objects.at(x, y))
 
-    map_make_fov(new_map)
+    if not incoming_map.is_blocked(*coords) and not occupied(*coords):
+        return coords
 
-    return new_map
+    if isinstance(incoming_map, obj_ChunkedMap):
+        x0, y0 = coords[0] - incoming_map.chunk_size, coords[1] - incoming_map.chunk_size
+        x1, y1 = coords[0] + incoming_map.chunk_size + 1, coords[1] + incoming_map.chunk_size + 1
+    else:
+        x0, y0, x1, y1 = 0, 0, incoming_map.width, incoming_map.height
+
+    free = ~incoming_map.get_region(x0, y0, x1, y1)[0]
+    for x, y in GAME.current_objects.tiles:
+        if x0 <= x < x1 and y0 <= y < y1 and occupied(x, y):
+            free[x - x0, y - y0] = False
+
+    free_x, free_y = np.nonzero(free)
+    if len(free_x) == 0:
+        return coords
+
+    closest = np.argmin((free_x + x0 - coords[0]) ** 2 + (free_y + y0 - coords[1]) ** 2)
+    return int(free_x[closest]) + x0, int(free_y[closest]) + y0
 
 
 def map_objects_at_coords(coords_x: int, coords_y: int):
@@ -955,7 +3105,7 @@ def map_objects_at_coords(coords_x: int, coords_y: int):
     coords_x = The x coordinate to check.
 
     coords_y : The y coordinate to check."""
-    objects = [obj for obj in GAME.current_objects if obj.x == coords_x and obj.y == coords_y]
+    objects = list(GAME.current_objects.at(coords_x, coords_y))
 
     return objects
 
@@ -984,10 +3134,19 @@ def map_get_objects(x: int = None, y: int = None,
     if excluded_objects is None:
         excluded_objects = []
 
-    if search_objects is None:
-        objs_to_search = GAME.current_objects
-    else:
+    if search_objects is not None:
         objs_to_search = search_objects
+    elif x is not None and y is not None:
+        # Only the actors on the tile can match
+        objs_to_search = GAME.current_objects.at(x, y)
+    elif creature:
+        objs_to_search = GAME.current_objects.with_component("creature")
+    elif item:
+        objs_to_search = GAME.current_objects.with_component("item")
+    elif container:
+        objs_to_search = GAME.current_objects.with_component("container")
+    else:
+        objs_to_search = GAME.current_objects
 
     for obj in objs_to_search:
         if obj in excluded_objects:
@@ -1034,12 +3193,17 @@ def map_get_creature(x: int = None, y: int = None,
     if excluded_objects is None:
         excluded_objects = []
 
-    if search_objects is None:
-        objs_to_search = [obj for obj in GAME.current_objects if obj.creature is not None]
+    if search_objects is not None:
+        objs_to_search = search_objects
+    elif x is not None and y is not None:
+        # Only the actors on the tile can match
+        objs_to_search = GAME.current_objects.at(x, y)
     else:
-        objs_to_search = [obj for obj in search_objects if obj.creature is not None]
+        objs_to_search = GAME.current_objects.with_component("creature")
 
     for obj in objs_to_search:
+        if obj.creature is None:
+            continue
         if obj in excluded_objects:
             continue
         if x is not None:
@@ -1059,83 +3223,416 @@ def map_get_creature(x: int = None, y: int = None,
 
 
 def map_make_fov(incoming_map: T_MAP):
-    """Creates an FOV map using libtcod in order to calculate the field of vision"""
-    global FOV_MAP
-    FOV_MAP = libtcod.map_new(MAP_WIDTH, MAP_HEIGHT)
+    """Rebuilds the FOV layer of the map from its tiles in order to calculate the field of vision.
+
+    Only needed after writing to map.block_path directly, map.set_block_path keeps the layer in sync."""
+    if isinstance(incoming_map, obj_ChunkedMap):
+        for chunk in incoming_map.chunks.values():
+            map_make_fov(chunk)
+    else:
+        np.logical_not(incoming_map.block_path, out=incoming_map.transparent)
 
-    for y in range(MAP_HEIGHT):
-        for x in range(MAP_WIDTH):
-            libtcod.map_set_properties(FOV_MAP, x, y,
-                                       not incoming_map[x][y].block_path,
-                                       not incoming_map[x][y].block_path)
+    # Any tile may have changed, so forget the individual changes
+    incoming_map.version += 1
+    incoming_map.changes.clear()
 
 
-def map_calculate_fov():
+def map_calculate_fov() -> np.ndarray:
     """Calculates the FOV. Should be called every time the player moves
-    (or any change that should result in an FOV change)."""
+    (or any change that should result in an FOV change).
+
+    Returns the boolean array of visible tiles of the current map."""
     global FOV_CALCULATE
 
     if FOV_CALCULATE:
         FOV_CALCULATE = False
-        libtcod.map_compute_fov(FOV_MAP, PLAYER.x, PLAYER.y, TORCH_RADIUS,
-                                FOV_LIGHT_WALLS, FOV_ALGO)
+        GAME.current_map.compute_fov(PLAYER.x, PLAYER.y, TORCH_RADIUS, FOV_LIGHT_WALLS, FOV_ALGO)
+
+    return GAME.current_map.visible
+
+
+def map_is_in_fov(x: int, y: int) -> bool:
+    """Returns TRUE if the tile was in the player's field of view when the FOV was last calculated."""
+    return GAME.current_map.is_visible(x, y)
 
 
-def map_check_wall(x, y):
-    return GAME.current_map[x][y].block_path
+def map_check_wall(x: int, y: int) -> bool:
+    """Returns TRUE if the tile blocks movement. Tiles outside the map count as walls."""
+    return GAME.current_map.is_blocked(x, y)
 
 
 def map_find_line(coords1: T_COORDINATE, coords2: T_COORDINATE,
                   include_start_point: bool = True) -> List[T_COORDINATE]:
     """Converts to x, y coordinates into a list of tiles.
 
+    Lines are remembered (up to LINE_CACHE_SIZE of them), so asking for the same line
+    again is cheap. The function does not keep any other state, so it can be called from any thread.
+
     # Arguments
     coords1 : (x1, y1) The starting point of the line
 
-    coords2 : (x2, y2) The ending point of the line"""
-    x1, y1 = coords1
-    x2, y2 = coords2
+    coords2 : (x2, y2) The ending point of the line
 
-    if x1 == x2 and y1 == y2:
-        if include_start_point:
-            return [(x1, x2)]
-        else:
-            return []
+    include_start_point : If False, the starting point is left out of the list."""
+    line = map_line_tiles(coords1[0], coords1[1], coords2[0], coords2[1])
 
-    libtcod.line_init(x1, y1, x2, y2)
-    calc_x, calc_y = libtcod.line_step()
     if include_start_point:
-        coord_list: List[T_COORDINATE] = [coords1]
+        return list(line)
+    else:
+        return list(line[1:])
+
+
+@lru_cache(maxsize=LINE_CACHE_SIZE)
+def map_line_tiles(x1: int, y1: int, x2: int, y2: int) -> Tuple[T_COORDINATE, ...]:
+    """Returns the tiles of the Bresenham line from (x1, y1) to (x2, y2), both included, as a tuple.
+
+    This gives the same tiles as libtcod's line_init/line_step, computed directly for each
+    step instead of by stepping: along the longer axis the line moves one tile per step, and
+    after t steps it has moved ceil((2 * t * minor - major) / (2 * major)) tiles along the
+    other one, where major and minor are the lengths of the line along each axis."""
+    step_x = 1 if x2 > x1 else -1 if x2 < x1 else 0
+    step_y = 1 if y2 > y1 else -1 if y2 < y1 else 0
+    delta_x, delta_y = abs(x2 - x1), abs(y2 - y1)
+
+    if delta_x > delta_y:
+        return tuple((x1 + step_x * t, y1 + step_y * max(0, -((delta_x - 2 * delta_y * t) // (2 * delta_x))))
+                     for t in range(delta_x + 1))
+    elif delta_y > 0:
+        return tuple((x1 + step_x * max(0, -((delta_y - 2 * delta_x * t) // (2 * delta_y))), y1 + step_y * t)
+                     for t in range(delta_y + 1))
     else:
-        coord_list: List[T_COORDINATE] = []
+        return (x1, y1),
+
+
+def map_find_lines(origins: np.ndarray, targets: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Rasterizes many lines at once. The tiles are the same as map_find_line's.
+
+    Returns (xs, ys, lengths): xs and ys are arrays of shape (number of lines, longest line)
+    where line i is made of the tiles (xs[i, :lengths[i]], ys[i, :lengths[i]]), start included.
+    The rest of each row repeats the last tile of the line.
+
+    # Arguments
+    origins : Array of shape (number of lines, 2) with the (x, y) starting point of each line.
+
+    targets : Array of shape (number of lines, 2) with the (x, y) ending point of each line."""
+    origins = np.asarray(origins, dtype=np.int64).reshape(-1, 2)
+    targets = np.asarray(targets, dtype=np.int64).reshape(-1, 2)
+
+    steps = np.sign(targets - origins)
+    deltas = np.abs(targets - origins)
+    x_major = deltas[:, 0] > deltas[:, 1]
+    major = np.where(x_major, deltas[:, 0], deltas[:, 1])
+    minor = np.where(x_major, deltas[:, 1], deltas[:, 0])
+
+    # Step number of every tile, stopping at the end of each line
+    t = np.minimum(np.arange(major.max(initial=0) + 1)[None, :], major[:, None])
+    safe_major = np.maximum(major, 1)[:, None]
+    minor_t = np.maximum(0, -((major[:, None] - 2 * minor[:, None] * t) // (2 * safe_major)))
 
-    while calc_x is not None:
-        coord_list.append((calc_x, calc_y))
-        if calc_x == x2 and calc_y == y2:
-            return coord_list
+    xs = origins[:, 0, None] + steps[:, 0, None] * np.where(x_major[:, None], t, minor_t)
+    ys = origins[:, 1, None] + steps[:, 1, None] * np.where(x_major[:, None], minor_t, t)
 
-        calc_x, calc_y = libtcod.line_step()
+    return xs, ys, major + 1
+
+
+def map_find_path(start: T_COORDINATE, goal: T_COORDINATE) -> List[T_COORDINATE]:
+    """Returns the shortest list of tiles to walk through from start to goal on the current map,
+    not including the start. Creatures are avoided when possible. Returns an empty list if there is no path.
+
+    # Arguments
+    start : (x, y) The coordinates to start from.
+
+    goal : (x, y) The coordinates to go to."""
+    return GAME.path_finder.find_path(GAME.current_map, start, goal, GAME.current_objects)
 
 
 def map_find_radius(coords: T_COORDINATE, radius: int, include_center: bool = True) -> List[T_COORDINATE]:
-    center_x, center_y = coords
-    tile_list: List[T_COORDINATE] = []
+    """Returns the tiles of the square around the coordinates, leaving out tiles outside the map.
+
+    # Arguments
+    coords : (x, y) The center of the square.
+
+    radius : The number of tiles between the center and the sides of the square.
+
+    include_center : If False, the center is left out of the list."""
+    return map_find_area("square", coords, radius, include_center=include_center).tiles()
+
+
+def map_find_area(shape: str, center: T_COORDINATE, radius: int, target: T_COORDINATE = None,
+                  inner_radius: int = 0, angle: float = 90.0, stop_at_walls: bool = False,
+                  in_fov: bool = False, include_center: bool = True, incoming_map: T_MAP = None) -> struc_Area:
+    """Returns the tiles of a shape as a struc_Area, leaving out tiles outside the map.
+
+    # Arguments
+    shape : One of:
+        - "square": every tile at most radius tiles away horizontally and vertically.
+        - "circle": every tile whose distance to the center is at most radius.
+        - "ring": the tiles of the circle that are further than inner_radius from the center.
+        - "cone": the tiles of the circle within angle / 2 degrees of the direction from center to target.
+        - "line": the tiles of the line from center towards target, at most radius steps long.
+
+    center : (x, y) The center of the shape (the start for lines and cones).
+
+    radius : The size of the shape.
+
+    target : (x, y) The point the line or cone is aimed at. Needed for those shapes.
+
+    inner_radius : The radius of the hole of a ring.
+
+    angle : The width of a cone in degrees.
+
+    stop_at_walls : If True, tiles hidden from the center by walls are left out.
+    Lines stop at the first wall.
+
+    in_fov : If True, tiles outside the player's field of view are left out.
+
+    include_center : If False, the center is left out of the area.
+
+    incoming_map : The map to query. Defaults to the current map."""
+    if incoming_map is None:
+        incoming_map = GAME.current_map
+
+    center_x, center_y = center
+    x0, y0 = center_x - radius, center_y - radius
+    x1, y1 = center_x + radius + 1, center_y + radius + 1
+
+    if not isinstance(incoming_map, obj_ChunkedMap):
+        # Clip the shape to the map
+        x0, y0 = max(x0, 0), max(y0, 0)
+        x1, y1 = min(x1, incoming_map.width), min(y1, incoming_map.height)
+    if x0 >= x1 or y0 >= y1:
+        return struc_Area(np.zeros((0, 0), dtype=bool), (center_x, center_y))
+
+    dx = np.arange(x0, x1)[:, None] - center_x
+    dy = np.arange(y0, y1)[None, :] - center_y
+    distance_squared = dx * dx + dy * dy
+
+    if shape == "square":
+        mask = np.ones((x1 - x0, y1 - y0), dtype=bool)
+    elif shape == "circle":
+        mask = distance_squared <= radius * radius
+    elif shape == "ring":
+        mask = (distance_squared <= radius * radius) & (distance_squared > inner_radius * inner_radius)
+    elif shape == "cone":
+        if target is None:
+            raise ValueError("A cone needs a target")
+        direction_x, direction_y = target[0] - center_x, target[1] - center_y
+        direction_length = (direction_x ** 2 + direction_y ** 2) ** 0.5 or 1.0
+        # cos(angle between the tile and the direction) >= cos(angle / 2)
+        min_cos = np.cos(np.radians(angle / 2))
+        mask = ((distance_squared <= radius * radius) &
+                (dx * direction_x + dy * direction_y >= min_cos * direction_length * np.sqrt(distance_squared)))
+    elif shape == "line":
+        if target is None:
+            raise ValueError("A line needs a target")
+        mask = np.zeros((x1 - x0, y1 - y0), dtype=bool)
+        for step, (x, y) in enumerate(map_line_tiles(center_x, center_y, target[0], target[1])):
+            if step > radius or not (x0 <= x < x1 and y0 <= y < y1):
+                break
+            mask[x - x0, y - y0] = True
+            if stop_at_walls and step > 0 and incoming_map.is_blocked(x, y):
+                break
+    else:
+        raise ValueError(f"Unknown shape: {shape}")
+
+    if stop_at_walls and shape != "line" and incoming_map.in_bounds(center_x, center_y):
+        block_path = incoming_map.get_region(x0, y0, x1, y1)[0]
+        mask &= libtcod.map.compute_fov(~block_path, (center_x - x0, center_y - y0), radius, True)
+
+    if in_fov:
+        mask &= incoming_map.get_region(x0, y0, x1, y1)[2]
 
-    start_x = center_x - radius
-    end_x = center_x + radius + 1
+    if not include_center and x0 <= center_x < x1 and y0 <= center_y < y1:
+        mask[center_x - x0, center_y - y0] = False
 
-    start_y = center_y - radius
-    end_y = center_y + radius + 1
+    return struc_Area(mask, (x0, y0))
 
-    # +1 because range(start, stop) does not include the stop value
-    for tile_x in range(start_x, end_x):
-        for tile_y in range(start_y, end_y):
-            tile_list.append((tile_x, tile_y))
 
-    if not include_center:
-        tile_list.remove(coords)
+def map_get_creatures_in(area: struc_Area, excluded_objects: List[obj_Actor] = None) -> List[obj_Actor]:
+    """Returns every creature inside the area, looking at either the tiles of the area or the creatures,
+    whichever there are fewer of.
+
+    # Arguments
+    area : The struc_Area returned by map_find_area.
+
+    excluded_objects : If given a list of actors, these actors are filtered from the search."""
+    if excluded_objects is None:
+        excluded_objects = []
+
+    if len(area) < len(GAME.current_objects.components["creature"]):
+        xs, ys = area.indices()
+        found = [obj for x, y in zip(xs.tolist(), ys.tolist())
+                 for obj in GAME.current_objects.at(x, y) if obj.creature is not None]
+    else:
+        found = [obj for obj in GAME.current_objects.with_component("creature") if area.contains(obj.x, obj.y)]
+
+    return [obj for obj in found if obj not in excluded_objects]
+
+
+#   ____                           _
+#  / ___| ___ _ __   ___ _ __ __ _| |_ ___  _ __ ___
+# | |  _ / _ \ '_ \ / _ \ '__/ _` | __/ _ \| '__/ __|
+# | |_| |  __/ | | |  __/ | | (_| | || (_) | |  \__ \
+#  \____|\___|_| |_|\___|_|  \__,_|\__\___/|_|  |___/
+
+# Every generator takes (width, height, rng) and returns a boolean array of
+# shape (width, height) that is TRUE where there is a wall.
+
+
+def gen_box(width: int, height: int, rng: np.random.Generator) -> np.ndarray:
+    """A single room surrounded by walls, with two pillars."""
+    block_path = np.zeros((width, height), dtype=bool)
+
+    if width > 10 and height > 15:
+        block_path[10, 10] = True
+        block_path[10, 15] = True
+
+    gen_surround_walls(block_path)
+
+    return block_path
+
+
+def gen_bsp(width: int, height: int, rng: np.random.Generator,
+            min_leaf_size: int = 8, room_margin: int = 1) -> np.ndarray:
+    """Rooms and corridors. The map is split recursively (binary space partitioning), a room
+    is carved in each leaf, and sibling partitions are joined with L shaped corridors.
+
+    # Arguments
+    min_leaf_size : The smallest width or height a partition can be split into.
+
+    room_margin : The minimum number of walls between a room and the edge of its partition."""
+    block_path = np.ones((width, height), dtype=bool)
+
+    def split(x0: int, y0: int, x1: int, y1: int) -> T_COORDINATE:
+        """Carves the partition and returns the center of one of its rooms."""
+        part_width, part_height = x1 - x0, y1 - y0
+        can_split_x = part_width >= min_leaf_size * 2
+        can_split_y = part_height >= min_leaf_size * 2
+
+        if not can_split_x and not can_split_y:
+            # Leaf: carve a room of random size inside the partition
+            room_width = rng.integers(max(part_width // 2, 2), max(part_width - room_margin * 2, 3))
+            room_height = rng.integers(max(part_height // 2, 2), max(part_height - room_margin * 2, 3))
+            room_x = x0 + rng.integers(room_margin, max(part_width - room_width - room_margin, room_margin) + 1)
+            room_y = y0 + rng.integers(room_margin, max(part_height - room_height - room_margin, room_margin) + 1)
+            block_path[room_x:room_x + room_width, room_y:room_y + room_height] = False
+
+            return room_x + room_width // 2, room_y + room_height // 2
+
+        if can_split_x and (not can_split_y or part_width > part_height):
+            cut = rng.integers(x0 + min_leaf_size, x1 - min_leaf_size + 1)
+            first, second = split(x0, y0, cut, y1), split(cut, y0, x1, y1)
+        else:
+            cut = rng.integers(y0 + min_leaf_size, y1 - min_leaf_size + 1)
+            first, second = split(x0, y0, x1, cut), split(x0, cut, x1, y1)
+
+        # Join the two halves with an L shaped corridor
+        (first_x, first_y), (second_x, second_y) = first, second
+        block_path[min(first_x, second_x):max(first_x, second_x) + 1, first_y] = False
+        block_path[second_x, min(first_y, second_y):max(first_y, second_y) + 1] = False
+
+        return first
+
+    split(1, 1, width - 1, height - 1)
+    gen_surround_walls(block_path)
+
+    return block_path
+
+
+def gen_caves(width: int, height: int, rng: np.random.Generator,
+              wall_chance: float = 0.45, iterations: int = 4) -> np.ndarray:
+    """Caves made with a cellular automaton. The map starts as random noise, then on each
+    iteration every tile becomes a wall if 5 or more of the 9 tiles around it (itself
+    included) are walls.
+    Caves that can not be reached from the largest cave are filled in.
+
+    # Arguments
+    wall_chance : The chance of each tile starting as a wall.
+
+    iterations : The number of times the automaton rule is applied."""
+    block_path = rng.random((width, height)) < wall_chance
+    gen_surround_walls(block_path)
+
+    for _ in range(iterations):
+        # Count the walls around every tile at once
+        padded = np.pad(block_path, 1, constant_values=True).astype(np.uint8)
+        neighbours = (padded[:-2, :-2] + padded[1:-1, :-2] + padded[2:, :-2] +
+                      padded[:-2, 1:-1] + padded[2:, 1:-1] +
+                      padded[:-2, 2:] + padded[1:-1, 2:] + padded[2:, 2:])
+        block_path = neighbours + block_path >= 5
+        gen_surround_walls(block_path)
+
+    return gen_fill_unreachable(block_path, rng)
 
-    return tile_list
+
+def gen_drunkard(width: int, height: int, rng: np.random.Generator,
+                 floor_fraction: float = 0.4, walkers: int = 8, steps_per_batch: int = 256) -> np.ndarray:
+    """Caves dug by random walkers, starting from the center of the map. The steps of all the
+    walkers are generated in batches and applied with a single array assignment.
+
+    # Arguments
+    floor_fraction : Walking stops once this fraction of the map is floor.
+
+    walkers : The number of walkers digging at the same time.
+
+    steps_per_batch : The number of steps each walker takes per batch."""
+    block_path = np.ones((width, height), dtype=bool)
+    directions = np.array([(0, -1), (0, 1), (-1, 0), (1, 0)])
+
+    positions = np.tile((width // 2, height // 2), (walkers, 1))
+    low, high = np.array([1, 1]), np.array([width - 2, height - 2])
+    floor_goal = int((width - 2) * (height - 2) * floor_fraction)
+
+    while np.count_nonzero(~block_path) < floor_goal:
+        steps = directions[rng.integers(0, 4, (walkers, steps_per_batch))]
+        path = np.clip(positions[:, None, :] + np.cumsum(steps, axis=1), low, high)
+        block_path[path[..., 0], path[..., 1]] = False
+        positions = path[:, -1, :]
+
+    return block_path
+
+
+def gen_surround_walls(block_path: np.ndarray):
+    """Turns the edges of the map into walls."""
+    block_path[0, :] = True
+    block_path[-1, :] = True
+    block_path[:, 0] = True
+    block_path[:, -1] = True
+
+
+def gen_fill_unreachable(block_path: np.ndarray, rng: np.random.Generator, attempts: int = 4) -> np.ndarray:
+    """Fills every floor tile that can not be reached from the largest of a few sampled
+    regions with walls, so the whole map is connected.
+
+    # Arguments
+    attempts : How many random floor tiles to try as the start of the region."""
+    floor_x, floor_y = np.nonzero(~block_path)
+    if len(floor_x) == 0:
+        return block_path
+
+    best_reachable = None
+    for _ in range(attempts):
+        start = rng.integers(0, len(floor_x))
+        distance = np.full(block_path.shape, np.iinfo(np.int32).max, dtype=np.int32)
+        distance[floor_x[start], floor_y[start]] = 0
+        libtcod.path.dijkstra2d(distance, (~block_path).astype(np.int8), 1, 0, out=distance)
+        reachable = distance != np.iinfo(np.int32).max
+
+        if best_reachable is None or np.count_nonzero(reachable) > np.count_nonzero(best_reachable):
+            best_reachable = reachable
+        if np.count_nonzero(best_reachable) * 2 > len(floor_x):
+            # No other region can be larger
+            break
+
+    return ~best_reachable
+
+
+MAP_GENERATORS: Dict[str, Callable[[int, int, np.random.Generator], np.ndarray]] = {
+    "box": gen_box,
+    "bsp": gen_bsp,
+    "caves": gen_caves,
+    "drunkard": gen_drunkard,
+}
 
 
 #  ____                     _
@@ -1150,84 +3647,115 @@ def draw_game(cursor: T_SURFACE = None, update_display: bool = True):
     """Draws the map, objects, console messages, and debug information and updates the screen"""
     global SURFACE_MAIN
 
-    # Clear the Surface
-    SURFACE_MAIN.fill(COLOR_DEFAULT_BG)
+    if not RENDERER.draws:
+        return
+
+    CAMERA.update(PLAYER.pos, GAME.current_map)
+    ANIMATION_CLOCK.tick()
 
-    # Draw the Map
+    # Draw the Map (it covers the whole surface, so there is no need to clear it first)
     draw_map(GAME.current_map)
 
     # Draw the Objects
     draw_objects()
 
+    if SHOW_MINIMAP:
+        draw_minimap()
+
     draw_debug()
     draw_messages()
 
+    RENDER_QUEUE.end_frame()
+
     # Update the Display
     if update_display:
         draw_update_display(cursor)
 
 
 def draw_debug():
-    """Draws debug information (currently on FPS) on the top left of the screen."""
+    """Draws debug information (the FPS and the number of images drawn in the last frame) on the top left
+    of the screen."""
     global SURFACE_MAIN
 
-    draw_text(SURFACE_MAIN, f"FPS: {int(CLOCK.get_fps())}", (0, 0), COLOR_WHITE, COLOR_BLACK)
+    debug_text = f"FPS: {int(CLOCK.get_fps())} Sprites: {RENDER_QUEUE.last_frame_sprites}"
+    DIRTY_RECTS.report("debug", draw_text(SURFACE_MAIN, debug_text, (0, 0), COLOR_WHITE, COLOR_BLACK), debug_text)
 
 
 def draw_objects():
-    """Draws all the actors (by calling obj_Actor.draw())."""
-    for obj in GAME.current_objects:
-        obj.draw()
+    """Draws all the visible actors on the screen in one batch through RENDER_QUEUE."""
+    camera_x0, camera_y0, camera_x1, camera_y1 = CAMERA.rect
+
+    if len(GAME.current_objects) <= CAMERA.width * CAMERA.height:
+        objs_to_draw = [obj for obj in GAME.current_objects if CAMERA.contains(obj.x, obj.y)]
+    else:
+        # There are more actors than tiles on the screen, only look at those tiles
+        objs_to_draw = [obj for x in range(camera_x0, camera_x1) for y in range(camera_y0, camera_y1)
+                        for obj in GAME.current_objects.at(x, y)]
+
+    for obj in objs_to_draw:
+        frame = obj.sprite()
+        if frame is not None:
+            draw_coords = CAMERA.world_to_screen(obj.x, obj.y)
+            RENDER_QUEUE.add(frame, draw_coords)
+            DIRTY_RECTS.report(obj, (draw_coords, frame.get_size()), frame)
+
+    RENDER_QUEUE.flush(SURFACE_MAIN)
+
+    # Come back when one of the animations on screen shows its next image
+    next_change_in = ANIMATION_CLOCK.next_change_in()
+    if next_change_in is not None:
+        SCHEDULER.request_redraw(next_change_in)
 
 
 def draw_messages():
-    """Draws the last [NUM_MESSAGES] messages on the bottom left of the screen."""
+    """Draws the last [NUM_MESSAGES] messages on the bottom left of the screen.
+
+    The messages are composited by MESSAGE_PANEL, which only does it again when there are new messages."""
     global SURFACE_MAIN
 
-    if len(GAME.message_history) <= NUM_MESSAGES:
-        to_draw = GAME.message_history
-    else:
-        to_draw = GAME.message_history[-NUM_MESSAGES:]
+    MESSAGE_PANEL.update(GAME.message_history)
+
+    panel_rect = MESSAGE_PANEL.surface.get_rect(bottomleft=(0, GAME_HEIGHT - PIXELS_UNDER_MESSAGES))
+    draw_surface(MESSAGE_PANEL.surface, SURFACE_MAIN, rect=panel_rect)
+    DIRTY_RECTS.report("messages", panel_rect, MESSAGE_PANEL.version)
+
+
+def draw_minimap():
+    """Draws the minimap of the MINIMAP_TILES around the player on the top right of the screen.
 
-    text_height = helper_text_height(ASSETS.F_MESSAGE)
-    start_y = ((MAP_HEIGHT * CELL_HEIGHT)
-               - (len(to_draw) * text_height)) - PIXELS_UNDER_MESSAGES
+    The image of the map is kept by MINIMAP, which only writes the tiles that changed."""
+    global SURFACE_MAIN
 
-    i = 0
-    for msg, msg_color, bg_color in to_draw:
-        draw_text(SURFACE_MAIN, msg, (0, start_y + (i * text_height)),
-                  msg_color, bg_color, ASSETS.F_MESSAGE)
+    MINIMAP.update(GAME.current_map, PLAYER.pos)
+    view = MINIMAP.view(PLAYER.pos, MINIMAP_TILES, MINIMAP_TILE_SIZE, helper_minimap_actors())
 
-        i += 1
+    view_rect = view.get_rect(topright=(GAME_WIDTH, 0))
+    SURFACE_MAIN.blit(view, view_rect)
+    DIRTY_RECTS.report("minimap", view_rect, view)
 
 
 def draw_map(map_to_draw: T_MAP):
     """Draws the specified map on the screen.
 
+    The map is drawn through TERRAIN_LAYER, which only repaints the tiles that
+    changed since the last frame and is then blitted in one go.  If LIGHTING
+    is on, it is first lit by LIGHT_MAP.
+
     # Arguments
     map_to_draw : The map to draw"""
     global SURFACE_MAIN
 
-    for x in range(MAP_WIDTH):
-        for y in range(MAP_HEIGHT):
-            is_visible = libtcod.map_is_in_fov(FOV_MAP, x, y)
+    repainted = TERRAIN_LAYER.update(map_to_draw, CAMERA)
 
-            if is_visible:
-                map_to_draw[x][y].explored = True
+    if not LIGHTING:
+        for rect in repainted:
+            DIRTY_RECTS.mark(rect)
+        SURFACE_MAIN.blit(TERRAIN_LAYER.surface, (0, 0))
+        return
 
-                if map_to_draw[x][y].block_path:
-                    # Draw Wall
-                    SURFACE_MAIN.blit(ASSETS.S_WALL, (x * CELL_WIDTH, y * CELL_WIDTH))
-                else:
-                    # Draw Floor
-                    SURFACE_MAIN.blit(ASSETS.S_FLOOR, (x * CELL_WIDTH, y * CELL_WIDTH))
-            elif map_to_draw[x][y].explored:
-                if map_to_draw[x][y].block_path:
-                    # Draw Wall
-                    SURFACE_MAIN.blit(ASSETS.S_WALL_EXPLORED, (x * CELL_WIDTH, y * CELL_WIDTH))
-                else:
-                    # Draw Floor
-                    SURFACE_MAIN.blit(ASSETS.S_FLOOR_EXPLORED, (x * CELL_WIDTH, y * CELL_WIDTH))
+    if LIGHT_MAP.update(map_to_draw, CAMERA, GAME.current_objects.with_component("light")) or repainted:
+        DIRTY_RECTS.mark(TERRAIN_LAYER.surface.get_rect())
+    SURFACE_MAIN.blit(LIGHT_MAP.draw(TERRAIN_LAYER, bool(repainted)), (0, 0))
 
 
 def draw_text(display_surface: T_SURFACE, text: str, coords: T_COORDINATE,
@@ -1249,6 +3777,8 @@ def draw_text(display_surface: T_SURFACE, text: str, coords: T_COORDINATE,
 
     mode : How to position the given coordinates.
     Available modes [corner (Default), center]
+
+    Returns the rectangle the text was drawn in.
     """
     if font is None:
         font = ASSETS.F_STANDARD
@@ -1262,6 +3792,8 @@ def draw_text(display_surface: T_SURFACE, text: str, coords: T_COORDINATE,
 
     display_surface.blit(text_surf, text_rect)
 
+    return text_rect
+
 
 def draw_surface(src: T_SURFACE, dest: T_SURFACE, coords: T_COORDINATE = (0, 0),
                  rect: T_RECT = None, area: T_RECT = None, mode: str = "corner"):
@@ -1279,6 +3811,8 @@ def draw_surface(src: T_SURFACE, dest: T_SURFACE, coords: T_COORDINATE = (0, 0),
 
     mode : How to position the given coordinates. It is not used if the 'rect' parameter is given.
     Available modes [corner (Default), center]
+
+    Returns the rectangle of the destination that was drawn on.
     """
     if rect is None:
         src_rect: T_RECT = src.get_rect()
@@ -1287,9 +3821,9 @@ def draw_surface(src: T_SURFACE, dest: T_SURFACE, coords: T_COORDINATE = (0, 0),
         else:
             src_rect.topleft = coords
 
-        dest.blit(src, src_rect, area=area)
+        return dest.blit(src, src_rect, area=area)
     else:
-        dest.blit(src, rect, area=area)
+        return dest.blit(src, rect, area=area)
 
 
 def draw_cursor(cursor: T_SURFACE):
@@ -1301,31 +3835,79 @@ def draw_cursor(cursor: T_SURFACE):
 
 
 def draw_crosshair(coords: T_COORDINATE):
-    coords = coords[0] * CELL_WIDTH, coords[1] * CELL_HEIGHT
+    coords = CAMERA.world_to_screen(*coords)
     draw_surface(ASSETS.S_CROSSHAIR, SURFACE_MAIN, coords)
 
 
 def draw_tile_rect(coords: T_COORDINATE, color: T_COLOR = None, alpha: int = 150):
-    coords = coords[0] * CELL_WIDTH, coords[1] * CELL_HEIGHT
-    new_surface = pygame.Surface([CELL_WIDTH, CELL_HEIGHT])
+    """Draws a translucent rectangle over the tile at the given map coordinates."""
+    draw_tile_rects([(coords, color)], alpha)
 
-    if color is None:
-        new_surface.fill(COLOR_WHITE)
-    else:
-        new_surface.fill(color)
 
-    new_surface.set_alpha(alpha)
-    draw_surface(new_surface, SURFACE_MAIN, coords)
+def draw_tile_rects(tiles: List[Tuple[T_COORDINATE, T_COLOR]], alpha: int = 150):
+    """Draws translucent rectangles over many tiles in a single batch.
+
+    # Arguments
+    tiles : List of (map coordinates, color) of the tiles to cover, drawn in order.
+    A color of None is white.
+
+    alpha : The opacity of the rectangles, from 0 to 255."""
+    to_blit = []
+    for (x, y), color in tiles:
+        if CAMERA.contains(x, y):
+            to_blit.append((helper_tile_overlay(tuple(color or COLOR_WHITE), alpha), CAMERA.world_to_screen(x, y)))
+
+    tile_rects = SURFACE_MAIN.blits(to_blit)
+
+    for (overlay, coords), tile_rect in zip(to_blit, tile_rects):
+        DIRTY_RECTS.report(("overlay", coords, overlay), tile_rect)
 
 
 def draw_update_display(cursor: T_SURFACE = None):
-    PYGAME_DISPLAY.blit(SURFACE_MAIN, (0, 0))
+    """Sends SURFACE_MAIN to the display, scaled up by DISPLAY_SCALE.
+
+    If DISPLAY_DIRTY_RECTS is set, only the rectangles reported to DIRTY_RECTS as changed are
+    scaled and updated, and nothing is done when nothing changed. Otherwise the whole
+    display is flipped.
+
+    The display is shown by RENDERER, and nothing is done if the renderer does not draw."""
+    if not RENDERER.draws:
+        return
+
+    if USE_CURSOR and cursor is not None:
+        # The cursor is drawn straight on the display, so everything under it has to be redrawn
+        DIRTY_RECTS.mark_all()
+
+    dirty_rects = DIRTY_RECTS.collect()
+
+    if DISPLAY_DIRTY_RECTS and not DISPLAY_SMOOTH:
+        for rect in dirty_rects:
+            draw_scaled(rect)
+    elif dirty_rects or not DISPLAY_DIRTY_RECTS:
+        # Smoothing blends every pixel with its neighbours, so the whole frame is scaled at once
+        draw_scaled(SURFACE_MAIN.get_rect())
+
     if USE_CURSOR and cursor is not None:
         pygame.mouse.set_visible(False)
         draw_cursor(cursor)
     elif USE_CURSOR:
         pygame.mouse.set_visible(True)
-    pygame.display.flip()
+
+    if DISPLAY_DIRTY_RECTS:
+        RENDERER.present([helper_scale_rect(rect) for rect in dirty_rects])
+    else:
+        RENDERER.present()
+
+
+def draw_scaled(rect: pygame.Rect):
+    """Copies a rectangle of SURFACE_MAIN to the same place on the display, scaled up by DISPLAY_SCALE."""
+    if DISPLAY_SCALE == 1:
+        PYGAME_DISPLAY.blit(SURFACE_MAIN, rect, area=rect)
+        return
+
+    display_rect = helper_scale_rect(rect)
+    scale = pygame.transform.smoothscale if DISPLAY_SMOOTH else pygame.transform.scale
+    scale(SURFACE_MAIN.subsurface(rect), display_rect.size, PYGAME_DISPLAY.subsurface(display_rect))
 
 
 #  _   _      _
@@ -1347,12 +3929,60 @@ def helper_text_objects(text: str, text_color: T_COLOR, back_color: T_COLOR = No
 
     back_color : The color of the background behind the text. Defaults to colorless.
 
-    font : The font to use to render the text."""
-    text_surface: T_SURFACE = font.render(text, False, text_color, back_color)
+    font : The font to use to render the text.
+
+    The text is rendered through TEXT_CACHE, so the surface returned is shared and must not be drawn on."""
+    text_surface: T_SURFACE = TEXT_CACHE.render(text, text_color, back_color, font)
 
     return text_surface, text_surface.get_rect()
 
 
+@lru_cache(maxsize=None)
+def helper_light_falloff(radius: int) -> np.ndarray:
+    """Returns the (2 * radius + 1) square array of how much of a light reaches each tile around it,
+    from 1 at the center down to 0 past the radius."""
+    offsets = np.arange(-radius, radius + 1)
+    distance = np.sqrt(offsets[:, None] ** 2 + offsets[None, :] ** 2)
+
+    return np.clip(1 - distance / (radius + 1), 0, 1).astype(np.float32)
+
+
+@lru_cache(maxsize=None)
+def helper_tile_overlay(color: T_COLOR, alpha: int) -> T_SURFACE:
+    """Returns a tile sized surface of the given color and alpha.
+
+    The surfaces are built once for each (color, alpha) and shared, they must not be drawn on."""
+    overlay = pygame.Surface((CELL_WIDTH, CELL_HEIGHT))
+    overlay.fill(color)
+    overlay.set_alpha(alpha)
+
+    return overlay
+
+
+def helper_scale_rect(rect: pygame.Rect) -> pygame.Rect:
+    """Returns where a rectangle of SURFACE_MAIN ends up on the display."""
+    return pygame.Rect(rect.x * DISPLAY_SCALE, rect.y * DISPLAY_SCALE,
+                       rect.width * DISPLAY_SCALE, rect.height * DISPLAY_SCALE)
+
+
+def helper_mouse_pos() -> T_COORDINATE:
+    """Returns the position of the mouse on SURFACE_MAIN, which is scaled up by DISPLAY_SCALE in the window."""
+    mouse_x, mouse_y = pygame.mouse.get_pos()
+
+    return mouse_x // DISPLAY_SCALE, mouse_y // DISPLAY_SCALE
+
+
+def helper_minimap_actors() -> List[Tuple[int, int, T_COLOR]]:
+    """Returns the (x, y, color) of the creatures in the player's field of view, and of the player last,
+    to draw on the minimap."""
+    actors = [(creature.x, creature.y, COLOR_MINIMAP_CREATURE)
+              for creature in GAME.current_objects.with_component("creature")
+              if creature is not PLAYER and map_is_in_fov(creature.x, creature.y)]
+    actors.append((PLAYER.x, PLAYER.y, COLOR_MINIMAP_PLAYER))
+
+    return actors
+
+
 def helper_text_height(font: T_FONT, text: str = 'a') -> int:
     """Returns the height in pixels of the font given.
 
@@ -1360,10 +3990,7 @@ def helper_text_height(font: T_FONT, text: str = 'a') -> int:
     font : The font to measure its height.
 
     text : If given, the sample text to measure the height. Defaults to 'a'."""
-    font_object = font.render(text, False, (0, 0, 0))
-    font_rect = font_object.get_rect()
-
-    return font_rect.height
+    return font.size(text)[1]
 
 
 def helper_text_width(font: T_FONT, text: str) -> int:
@@ -1372,10 +3999,8 @@ def helper_text_width(font: T_FONT, text: str) -> int:
     # Arguments
     font : The font to render the text.
 
-    text : The text to render and then measure its width."""
-    font_object: T_SURFACE = font.render(text, False, (0, 0, 0))
-    font_rect: T_RECT = font_object.get_rect()
-    return font_rect.width
+    text : The text to measure its width."""
+    return font.size(text)[0]
 
 
 def access_dawnlike(further_path: str, prefix: str = '') -> str:
@@ -1397,29 +4022,65 @@ def access_dawnlike_list(further_paths: List[str], prefix: str = '') -> List[str
 
 
 def menu_pause():
-    """This menu pauses the game and displays a simple message"""
+    """This menu pauses the game and displays a simple message.
+
+    The message is drawn once, then the menu sleeps until a key is pressed."""
     global SURFACE_MAIN
 
     menu_text = "PAUSED"
     menu_font = ASSETS.F_STANDARD
 
+    # Draw the text at the center of the game window
+    text_rect = draw_text(SURFACE_MAIN, menu_text, (GAME_WIDTH / 2, GAME_HEIGHT / 2),
+                          COLOR_WHITE, COLOR_BLACK, menu_font, "center")
+    DIRTY_RECTS.report("menu", text_rect, menu_text)
+    draw_update_display()
+
     menu_close = False
     while not menu_close:
-        events_list = pygame.event.get()
-        for event in events_list:
-            if event.type == pygame.QUIT:
-                game_exit()
+        event = pygame.event.wait()
 
-            elif event.type == pygame.KEYDOWN:
-                if event.key in [pygame.K_p, pygame.K_ESCAPE]:
-                    menu_close = True
+        if event.type == pygame.QUIT:
+            game_exit()
 
-        # Draw the text at the center of the game window
-        draw_text(SURFACE_MAIN, menu_text, (GAME_WIDTH / 2, GAME_HEIGHT / 2),
-                  COLOR_WHITE, COLOR_BLACK, menu_font, "center")
-        draw_debug()
-        CLOCK.tick(GAME_FPS)
-        draw_update_display()
+        elif event.type == pygame.KEYDOWN:
+            if event.key in [pygame.K_p, pygame.K_ESCAPE]:
+                menu_close = True
+
+        elif event.type in [pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED]:
+            DIRTY_RECTS.mark_all()
+            draw_update_display()
+
+
+def menu_overview():
+    """Shows the whole map (or the area MINIMAP keeps of a chunked map) over the whole screen.
+
+    The overview is drawn once, then the menu sleeps until M or escape is pressed."""
+    global SURFACE_MAIN
+
+    MINIMAP.update(GAME.current_map, PLAYER.pos)
+    overview = MINIMAP.overview(SCENE_SIZE, helper_minimap_actors())
+    overview_rect = overview.get_rect(center=(GAME_WIDTH / 2, GAME_HEIGHT / 2))
+
+    SURFACE_MAIN.fill(COLOR_BLACK)
+    SURFACE_MAIN.blit(overview, overview_rect)
+    DIRTY_RECTS.report("menu", SURFACE_MAIN.get_rect(), overview)
+    draw_update_display()
+
+    menu_close = False
+    while not menu_close:
+        event = pygame.event.wait()
+
+        if event.type == pygame.QUIT:
+            game_exit()
+
+        elif event.type == pygame.KEYDOWN:
+            if event.key in [pygame.K_m, pygame.K_ESCAPE]:
+                menu_close = True
+
+        elif event.type in [pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED]:
+            DIRTY_RECTS.mark_all()
+            draw_update_display()
 
 
 def menu_inventory():
@@ -1429,8 +4090,8 @@ def menu_inventory():
     Right clicking an item will drop it."""
 
     # Menu Characteristics
-    menu_width = 300
-    menu_height = 200
+    menu_width = 150
+    menu_height = 100
 
     menu_text_font = ASSETS.F_MESSAGE
     menu_text_height = helper_text_height(menu_text_font)
@@ -1441,17 +4102,14 @@ def menu_inventory():
     local_inventory_rect: T_RECT = local_inventory_surface.get_rect()
     local_inventory_rect.center = (GAME_WIDTH / 2, GAME_HEIGHT / 2)
 
+    # The game is drawn once, the menu is then only drawn over it when it changes
+    frozen_frame = obj_FrozenFrame(ASSETS.S_CURSOR_INVENTORY)
+    inventory = tuple(PLAYER.container.inventory)
+
     menu_close = False
     while not menu_close:
-        # Clear the menu
-        local_inventory_surface.fill(COLOR_BLACK)
-
-        # TODO: Register Changes
-        print_list = [obj.name_object for obj in PLAYER.container.inventory]
-
-        events_list = pygame.event.get()
-        mouse_x, mouse_y = pygame.mouse.get_pos()
-        mouse_rel_x = mouse_x - local_inventory_rect.topleft[0]
+        events_list = frozen_frame.wait_events()
+        mouse_x, mouse_y = helper_mouse_pos()
         mouse_rel_y = mouse_y - local_inventory_rect.topleft[1]
 
         mouse_in_window = bool(local_inventory_rect.collidepoint(mouse_x, mouse_y))
@@ -1468,42 +4126,51 @@ def menu_inventory():
             elif event.type == pygame.MOUSEBUTTONUP:
                 if event.button == 1:
                     # Left Click TODO: Allow examining the items
-                    if mouse_in_window and 0 < mouse_line_selection <= len(print_list):
-                        PLAYER.container.inventory[mouse_line_selection - 1].item.use()
+                    if mouse_in_window and 0 < mouse_line_selection <= len(inventory):
+                        inventory[mouse_line_selection - 1].item.use()
                         menu_close = True
                 elif event.button == 3:
                     # Right Click: Drop the item
-                    if mouse_in_window and 0 < mouse_line_selection <= len(print_list):
-                        PLAYER.container.inventory[mouse_line_selection - 1].item.drop()
+                    if mouse_in_window and 0 < mouse_line_selection <= len(inventory):
+                        inventory[mouse_line_selection - 1].item.drop()
+
+        if menu_close:
+            break
+
+        if tuple(PLAYER.container.inventory) != inventory:
+            # Dropping an item changes the game behind the menu
+            inventory = tuple(PLAYER.container.inventory)
+            frozen_frame.capture()
+
+        selected_line = mouse_line_selection if mouse_in_window else None
+        if not frozen_frame.changed((inventory, selected_line)):
+            continue
 
         # Draw Menu
+        local_inventory_surface.fill(COLOR_BLACK)
         draw_text(local_inventory_surface, "Inventory:", (0, 0), COLOR_WHITE, font=menu_text_font)
         # line starts at 1 to account for the "Inventory:" text that appears at the top
-        for line, name in enumerate(print_list, start=1):
-            if mouse_in_window and line == mouse_line_selection:
+        for line, obj in enumerate(inventory, start=1):
+            if line == selected_line:
                 # Reverse text and background color to show that it is being selected
-                draw_text(local_inventory_surface, name, (0, line * menu_text_height),
+                draw_text(local_inventory_surface, obj.name_object, (0, line * menu_text_height),
                           text_color=menu_text_bg, back_color=menu_text_color, font=menu_text_font)
             else:
-                draw_text(local_inventory_surface, name, (0, line * menu_text_height),
+                draw_text(local_inventory_surface, obj.name_object, (0, line * menu_text_height),
                           text_color=menu_text_color, back_color=menu_text_bg, font=menu_text_font)
-        # Display Menu
-
-        draw_game(update_display=False)
 
+        # Display Menu
         draw_surface(local_inventory_surface, SURFACE_MAIN, rect=local_inventory_rect)
-        draw_debug()
-
-        CLOCK.tick(GAME_FPS)
-        draw_update_display(ASSETS.S_CURSOR_INVENTORY)
+        DIRTY_RECTS.report("menu", local_inventory_rect, frozen_frame.state)
+        draw_update_display(frozen_frame.cursor)
 
 
 def menu_drop():
     """Opens up the drop menu. The player can click on an item to drop it."""
 
     # Menu Characteristics
-    menu_width = 300
-    menu_height = 200
+    menu_width = 150
+    menu_height = 100
 
     menu_text_font = ASSETS.F_MESSAGE
     menu_text_height = helper_text_height(menu_text_font)
@@ -1514,17 +4181,14 @@ def menu_drop():
     local_inventory_rect: T_RECT = local_inventory_surface.get_rect()
     local_inventory_rect.center = (GAME_WIDTH / 2, GAME_HEIGHT / 2)
 
+    # The game is drawn once, the menu is then only drawn over it when it changes
+    frozen_frame = obj_FrozenFrame()
+    inventory = tuple(PLAYER.container.inventory)
+
     menu_close = False
     while not menu_close:
-        # Clear the menu
-        local_inventory_surface.fill(COLOR_BLACK)
-
-        # TODO: Register Changes
-        print_list = [obj.name_object for obj in PLAYER.container.inventory]
-
-        events_list = pygame.event.get()
-        mouse_x, mouse_y = pygame.mouse.get_pos()
-        mouse_rel_x = mouse_x - local_inventory_rect.topleft[0]
+        events_list = frozen_frame.wait_events()
+        mouse_x, mouse_y = helper_mouse_pos()
         mouse_rel_y = mouse_y - local_inventory_rect.topleft[1]
 
         mouse_in_window = bool(local_inventory_rect.collidepoint(mouse_x, mouse_y))
@@ -1541,24 +4205,37 @@ def menu_drop():
             elif event.type == pygame.MOUSEBUTTONUP:
                 # Left Click
                 if event.button == 1:
-                    if mouse_in_window and 0 < mouse_line_selection <= len(print_list):
-                        PLAYER.container.inventory[mouse_line_selection - 1].item.drop()
+                    if mouse_in_window and 0 < mouse_line_selection <= len(inventory):
+                        inventory[mouse_line_selection - 1].item.drop()
+
+        if menu_close:
+            break
+
+        if tuple(PLAYER.container.inventory) != inventory:
+            # Dropping an item changes the game behind the menu
+            inventory = tuple(PLAYER.container.inventory)
+            frozen_frame.capture()
+
+        selected_line = mouse_line_selection if mouse_in_window else None
+        if not frozen_frame.changed((inventory, selected_line)):
+            continue
 
         # Draw Menu
+        local_inventory_surface.fill(COLOR_BLACK)
         draw_text(local_inventory_surface, "Inventory:", (0, 0), COLOR_WHITE, font=menu_text_font)
         # line starts at 1 to account for the "Inventory:" text that appears at the top
-        for line, name in enumerate(print_list, start=1):
-            if mouse_in_window and line == mouse_line_selection:
+        for line, obj in enumerate(inventory, start=1):
+            if line == selected_line:
                 # Reverse text and background color to show that it is being selected
-                draw_text(local_inventory_surface, name, (0, line * menu_text_height),
+                draw_text(local_inventory_surface, obj.name_object, (0, line * menu_text_height),
                           text_color=menu_text_bg, back_color=menu_text_color, font=menu_text_font)
             else:
-                draw_text(local_inventory_surface, name, (0, line * menu_text_height),
+                draw_text(local_inventory_surface, obj.name_object, (0, line * menu_text_height),
                           text_color=menu_text_color, back_color=menu_text_bg, font=menu_text_font)
+
         # Display Menu
         draw_surface(local_inventory_surface, SURFACE_MAIN, rect=local_inventory_rect)
-        draw_debug()
-        CLOCK.tick(GAME_FPS)
+        DIRTY_RECTS.report("menu", local_inventory_rect, frozen_frame.state)
         draw_update_display()
 
 
@@ -1577,10 +4254,9 @@ def old_menu_tile_select(coords_origin: T_COORDINATE = None, display_start_coord
 
         # Get button clicks
         events_list = pygame.event.get()
-        mouse_x, mouse_y = pygame.mouse.get_pos()
+        mouse_x, mouse_y = helper_mouse_pos()
 
-        map_coord_x = mouse_x // CELL_WIDTH
-        map_coord_y = mouse_y // CELL_HEIGHT
+        map_coord_x, map_coord_y = CAMERA.screen_to_world(mouse_x, mouse_y)
 
         valid_tiles = []
 
@@ -1624,10 +4300,8 @@ def old_menu_tile_select(coords_origin: T_COORDINATE = None, display_start_coord
         draw_game(cursor=ASSETS.S_CURSOR_INSPECT, update_display=False)
 
         # Draw crosshair at mouse position on top of the game
-        for tile_x, tile_y in valid_tiles:
-            if not display_start_coordinate and (tile_x, tile_y) == coords_origin:
-                continue
-            draw_tile_rect((tile_x, tile_y))
+        draw_tile_rects([(tile, None) for tile in valid_tiles
+                         if display_start_coordinate or tile != coords_origin])
         # draw_crosshair((mouse_x_rel, mouse_y_rel))
 
         # Draw debug information
@@ -1681,15 +4355,17 @@ def menu_tile_select(line_config: Dict = None, circle_config: Dict = None, ignor
         radius = radius if "radius" not in circle_config else circle_config["radius"]
         circle_color = circle_color if "circle_color" not in circle_config else circle_config["circle_color"]
 
+    # The game is drawn once, the tiles are then only drawn over it when the mouse moves to another tile
+    frozen_frame = obj_FrozenFrame(ASSETS.S_CURSOR_INSPECT)
+
     menu_close = False
 
     while not menu_close:
         # Get button clicks
-        events_list = pygame.event.get()
-        mouse_x, mouse_y = pygame.mouse.get_pos()
+        events_list = frozen_frame.wait_events()
+        mouse_x, mouse_y = helper_mouse_pos()
 
-        map_coord_x = mouse_x // CELL_WIDTH
-        map_coord_y = mouse_y // CELL_HEIGHT
+        map_coord_x, map_coord_y = CAMERA.screen_to_world(mouse_x, mouse_y)
 
         valid_tiles = []
 
@@ -1729,28 +4405,26 @@ def menu_tile_select(line_config: Dict = None, circle_config: Dict = None, ignor
                     if not ignore_click:
                         return valid_tiles[-1]
 
-        # Draw Game First
-        draw_game(cursor=ASSETS.S_CURSOR_INSPECT, update_display=False)
+        if menu_close or not frozen_frame.changed((map_coord_x, map_coord_y)):
+            continue
+
+        # Put the game back, without the tiles drawn for the last mouse position
+        frozen_frame.restore()
 
         # Draw crosshair at mouse position on top of the game
-        for tile_x, tile_y in valid_tiles:
-            if not display_start_coordinates and (tile_x, tile_y) == coords_origin:
-                continue
-            draw_tile_rect((tile_x, tile_y), line_color)
+        preview_tiles = [(tile, line_color) for tile in valid_tiles
+                         if display_start_coordinates or tile != coords_origin]
 
         if radius is not None:
-            circle_tiles = map_find_radius(valid_tiles[-1], radius)
-            for tile_x, tile_y in circle_tiles:
-                draw_tile_rect((tile_x, tile_y), circle_color)
+            circle_tiles = map_find_area("square", valid_tiles[-1], radius).tiles()
+            preview_tiles.extend((tile, circle_color) for tile in circle_tiles)
 
-        # draw_crosshair((mouse_x_rel, mouse_y_rel))
+        draw_tile_rects(preview_tiles)
 
-        # Draw debug information
-        draw_debug()
-        CLOCK.tick(GAME_FPS)
+        # draw_crosshair((mouse_x_rel, mouse_y_rel))
 
         # Update the display
-        draw_update_display()
+        draw_update_display(frozen_frame.cursor)
 
 
 #   _______      ___      .___  ___.  _______
@@ -1767,8 +4441,11 @@ def game_main_loop():
 
     while not game_quit:
 
+        # Wait for input (or for the next animation frame)
+        events_list = SCHEDULER.wait_events()
+
         # Handle player input
-        player_action = game_handle_keys()
+        player_action = game_handle_keys(events_list)
 
         map_calculate_fov()
 
@@ -1780,55 +4457,88 @@ def game_main_loop():
                 if obj.ai:
                     obj.ai.take_turn()
 
-        # Draw the Game
-        draw_game(cursor=ASSETS.S_CURSOR_STANDARD)
+        # Draw the Game, only if something changed
+        if SCHEDULER.should_redraw(events_list, player_action):
+            SCHEDULER.drawn()
+            draw_game(cursor=ASSETS.S_CURSOR_STANDARD)
 
-        CLOCK.tick(GAME_FPS)
+            CLOCK.tick(GAME_FPS)
 
     # Quit the Game
     game_exit()
 
 
-def game_initialize():
-    """This function initializes the main window and pygame and other global variables"""
+def game_initialize(renderer_backend: str = RENDERER_BACKEND):
+    """This function initializes the main window and pygame and other global variables
+
+    # Arguments
+    renderer_backend : Where the game is drawn, one of RENDERERS ("windowed", "offscreen" or "null")."""
+
+    global PYGAME_DISPLAY, SURFACE_MAIN, GAME, CLOCK, FOV_CALCULATE, PLAYER, ASSETS, CAMERA, TERRAIN_LAYER, \
+        DIRTY_RECTS, TEXT_CACHE, MESSAGE_PANEL, RENDER_QUEUE, SCHEDULER, \
+        ANIMATION_CLOCK, RENDERER, LIGHT_MAP, MINIMAP
 
-    global PYGAME_DISPLAY, SURFACE_MAIN, GAME, CLOCK, FOV_CALCULATE, PLAYER, ASSETS
+    RENDERER = RENDERERS[renderer_backend]()
+    RENDERER.prepare()
 
     # initialize pygame
     pygame.init()
 
     pygame.key.set_repeat(200, 70)
 
-    PYGAME_DISPLAY = pygame.display.set_mode(WINDOW_SIZE)
+    PYGAME_DISPLAY = RENDERER.open(WINDOW_SIZE)
+
+    SURFACE_MAIN = pygame.Surface(SCENE_SIZE)
+
+    DIRTY_RECTS = obj_DirtyRects(SURFACE_MAIN.get_rect())
+
+    TEXT_CACHE = obj_TextCache()
 
-    SURFACE_MAIN = pygame.Surface(WINDOW_SIZE)
+    RENDER_QUEUE = obj_RenderQueue()
+
+    SCHEDULER = obj_FrameScheduler()
+
+    ANIMATION_CLOCK = obj_AnimationClock()
 
     GAME = obj_Game()
 
     CLOCK = pygame.time.Clock()
 
+    CAMERA = obj_Camera()
+
     FOV_CALCULATE = True
 
     if USE_CURSOR:
         pygame.mouse.set_visible(False)
 
     ASSETS = struc_Assets()
-    PLAYER = obj_Actor(13, 13, "human", ASSETS.A_PLAYER, creature=com_Creature("Greg"), container=com_Container())
-    ENEMY = obj_Actor(15, 15, "Smart Crab", ASSETS.A_ENEMY,
+    TERRAIN_LAYER = obj_TerrainLayer()
+    LIGHT_MAP = obj_LightMap()
+    MINIMAP = obj_Minimap()
+    MESSAGE_PANEL = obj_MessagePanel(ASSETS.F_MESSAGE)
+    # Every actor is added to the game before the next one is spawned, so they do not end up on the same tile
+    PLAYER = obj_Actor(*map_find_spawn(PLAYER_SPAWN), "human", ASSETS.A_PLAYER,
+                       creature=com_Creature("Greg"), container=com_Container(), light=com_Light(TORCH_RADIUS))
+    GAME.current_objects.append(PLAYER)
+    ENEMY = obj_Actor(*map_find_spawn((15, 15)), "Smart Crab", ASSETS.A_ENEMY,
                       creature=com_Creature("Jackie", death_function=death_monster), ai=ai_Chase())
-    ENEMY2 = obj_Actor(14, 15, "Dumb Crab", ASSETS.A_ENEMY,
+    GAME.current_objects.append(ENEMY)
+    ENEMY2 = obj_Actor(*map_find_spawn((14, 15)), "Dumb Crab", ASSETS.A_ENEMY,
                        creature=com_Creature("Bob", death_function=death_monster), ai=ai_Confuse())
-
-    GAME.current_objects.extend([PLAYER, ENEMY, ENEMY2])
+    GAME.current_objects.append(ENEMY2)
 
 
-def game_handle_keys() -> str:
+def game_handle_keys(events_list: List[pygame.event.Event] = None) -> str:
     """Handles the key inputs given by the player during the main game loop
-    and returns the action taken by the player."""
+    and returns the action taken by the player.
+
+    # Arguments
+    events_list : The events to handle. Defaults to the events waiting in pygame's queue."""
     global FOV_CALCULATE
 
     # Get Player Input
-    events_list = pygame.event.get()
+    if events_list is None:
+        events_list = pygame.event.get()
 
     response = "no-action"
 
@@ -1837,6 +4547,10 @@ def game_handle_keys() -> str:
         if event.type == pygame.QUIT:
             return "QUIT"
 
+        elif event.type in [pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED]:
+            # The window was covered, everything has to be sent to the display again
+            DIRTY_RECTS.mark_all()
+
         elif event.type == pygame.KEYDOWN:
             if event.key in [pygame.K_UP, pygame.K_KP8]:
                 if PLAYER.creature.move(0, -1):
@@ -1882,6 +4596,8 @@ def game_handle_keys() -> str:
                 menu_inventory()
             elif event.key in [pygame.K_p]:
                 menu_pause()
+            elif event.key in [pygame.K_m]:
+                menu_overview()
             elif event.key in [pygame.K_d]:
                 menu_drop()
             elif event.key in [pygame.K_l]:
@@ -1890,6 +4606,10 @@ def game_handle_keys() -> str:
             elif event.key in [pygame.K_f]:
                 cast_fireball()
                 response = "player-attacked"
+            elif event.key in [pygame.K_PAGEUP]:
+                MESSAGE_PANEL.scroll_by(MESSAGE_SCROLL_LINES)
+            elif event.key in [pygame.K_PAGEDOWN]:
+                MESSAGE_PANEL.scroll_by(-MESSAGE_SCROLL_LINES)
             elif event.key in [pygame.K_h]:
                 game_message(f"You are at {PLAYER.creature.hp}/{PLAYER.creature.MAX_HP} health!")
             elif event.key in [pygame.K_c]:
@@ -1914,6 +4634,7 @@ def game_message(game_msg: str, msg_color: T_COLOR = COLOR_GREY, bg_color: T_COL
 
 def game_exit():
     """Disengage pygame and exit the program."""
+    RENDERER.close()
     pygame.quit()
     exit()
 